@@ -94,17 +94,16 @@ if use_real_api:
     print(f"   Processing {len(texts)} documents...")
     
     try:
-        for i, text in enumerate(texts, 1):
-            # Call OpenAI API to get embedding
-            response = client.embeddings.create(
-                model="text-embedding-3-small",
-                input=text
-            )
-            
-            # Extract the embedding vector
-            embedding = response.data[0].embedding
-            embeddings.append(embedding)
-            
+        # Call OpenAI API ONCE with the whole list of texts
+        # (same tokens as one call per document, but a single HTTP round-trip)
+        response = client.embeddings.create(
+            model="text-embedding-3-small",
+            input=texts
+        )
+
+        # Extract the embedding vectors (sorted by index to keep document order)
+        for i, item in enumerate(sorted(response.data, key=lambda d: d.index), 1):
+            embeddings.append(item.embedding)
             print(f"  ✓ Document {i}/{len(texts)}: {documents[i-1]['topic']}")
         
         print(f"\nCreated {len(embeddings)} embeddings successfully!")
@@ -23,14 +23,21 @@ FEATURES
 • Live agent trace — every node logs what it is doing as it runs.
 • Memory display  — after each answer, see the full conversation history.
 • Retry logic     — if search fails, the graph retries automatically.
+• Checkpointing   — graph state is saved to SQLite per question, so an
+                    interrupted run resumes from the last completed node
+                    (restart with AGENT_SESSION_ID=<id> and ask it again).
 • Demo mode       — works even without an API key (simulated responses).
 • Clean exit      — type "quit" or press Ctrl+C at any time.
 """
 
+import asyncio
+import functools
+import importlib.util
 import os
 import sys
+import time
+import uuid
 from dotenv import load_dotenv
-from datetime import datetime
 
 # ============================================================================
 # BANNER
@@ -47,6 +54,39 @@ def print_banner():
     print("█" * 70)
 
 
+# ============================================================================
+# MEMORY WRAPPER
+# ============================================================================
+
+class IncrementalBufferMemory:
+    """
+    ConversationBufferMemory plus an always-current list of display lines.
+
+    Each save appends two lines (O(1)), so show_memory() does not re-walk
+    and re-format the whole history every time.
+    """
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+        self._lines: list[str] = []
+
+    def save_context(self, inputs: dict, outputs: dict):
+        self._buffer.save_context(inputs, outputs)
+        self._lines.append(f"[You ] {inputs['input']}")
+        self._lines.append(f"[AI  ] {outputs['output']}")
+
+    def clear(self):
+        self._buffer.clear()
+        self._lines.clear()
+
+    def tail(self, k: int) -> list[str]:
+        return self._lines[-k:]
+
+    @property
+    def size(self) -> int:
+        return len(self._lines)
+
+
 # ============================================================================
 # BOOTSTRAP
 # ============================================================================
@@ -55,30 +95,86 @@ load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 HAS_KEY = bool(OPENAI_API_KEY) and OPENAI_API_KEY != "your_openai_api_key_here"
 
-llm     = None
-search  = None
-memory  = None
+def make_http_client():
+    """
+    httpx client that asks OpenAI for compressed responses (brotli when
+    the decoder is installed, gzip otherwise) over HTTP/2 when h2 is
+    available.  Returns None if httpx itself is missing.
+    """
+    try:
+        import httpx
+    except ImportError:
+        return None
+    try:
+        import brotli  # noqa: F401
+        encodings = "br, gzip"
+    except ImportError:
+        encodings = "gzip"
+    headers = {"Accept-Encoding": encodings}
+    try:
+        return httpx.Client(headers=headers, http2=True)
+    except ImportError:     # h2 not installed
+        return httpx.Client(headers=headers)
+
 
-if HAS_KEY:
+# The LangChain / LangGraph imports are slow and memory-hungry, so each
+# component is imported and built on first use (then cached).  Demo runs
+# that never touch a component never pay for its import.
+
+@functools.cache
+def _get_llm():
+    if not HAS_KEY:
+        return None
     try:
         from langchain_openai import ChatOpenAI
-        llm = ChatOpenAI(model="gpt-4o-mini", temperature=0, api_key=OPENAI_API_KEY)
+        return ChatOpenAI(model="gpt-4o-mini", temperature=0, api_key=OPENAI_API_KEY,
+                          http_client=make_http_client())
+    except Exception:
+        return None
+
+
+@functools.cache
+def _get_search():
+    try:
+        from langchain_community.tools import DuckDuckGoSearchRun
+        return DuckDuckGoSearchRun()
     except Exception:
-        HAS_KEY = False
+        return None
 
-try:
-    from langchain_community.tools import DuckDuckGoSearchRun
-    search = DuckDuckGoSearchRun()
-except Exception:
-    pass
 
-try:
-    from langchain.memory import ConversationBufferMemory
-    memory = ConversationBufferMemory(return_messages=True)
-except Exception:
-    pass
+@functools.cache
+def _get_memory():
+    try:
+        from langchain.memory import ConversationBufferMemory
+        return IncrementalBufferMemory(ConversationBufferMemory(return_messages=True))
+    except Exception as e:
+        print(f"       ⚠️  Memory disabled — langchain.memory unavailable: {e}")
+        return None
 
 MAX_RETRIES = 2
+MEMORY_DISPLAY_LIMIT = 20   # lines shown by show_memory()
+# Manual fallback only: plan the retry query while the search is still
+# running.  Saves a round-trip on retries but costs an extra LLM call on
+# every question whose first search is fine, so it is off by default.
+SPECULATIVE_REPLAN = os.getenv("SPECULATIVE_REPLAN", "0") == "1"
+# Router return values, interned once so the routing-table lookup on each
+# step compares by identity.
+ROUTE_SUMMARIZE = sys.intern("summarize")
+ROUTE_PLANNER   = sys.intern("planner")
+ROUTE_END       = sys.intern("end")
+
+RETRY_HINT = (
+    "The previous query did not return useful results. "
+    "Try a completely different angle or add more specific keywords."
+)
+
+# One checkpoint thread per question ("<session>-q<n>"), so a new question
+# never starts from the previous one's saved state.  Pass the printed
+# session id back in AGENT_SESSION_ID to resume an interrupted question
+# from its last completed node instead of re-running it from scratch.
+SESSION_ID = os.getenv("AGENT_SESSION_ID") or str(uuid.uuid4())
+CHECKPOINT_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "data", "agent_ckpt.db")
 
 
 # ============================================================================
@@ -86,6 +182,7 @@ MAX_RETRIES = 2
 # ============================================================================
 
 def call_llm(prompt_text: str, demo_fallback: str) -> str:
+    llm = _get_llm()
     if llm:
         try:
             from langchain.schema import HumanMessage
@@ -96,9 +193,14 @@ def call_llm(prompt_text: str, demo_fallback: str) -> str:
     return demo_fallback
 
 
+_START = time.monotonic()
+
+
 def log_agent(name: str, action: str):
-    ts = datetime.now().strftime("%H:%M:%S")
-    print(f"  [{ts}] 🤖 {name:>12} │ {action}")
+    # Elapsed time since start-up instead of wall-clock strftime — no datetime
+    # object to allocate and format on every node.
+    elapsed_ms = int((time.monotonic() - _START) * 1000)
+    print(f"  [+{elapsed_ms:>6}ms] 🤖 {name:>12} │ {action}")
 
 
 # ============================================================================
@@ -122,6 +224,23 @@ Raw search results:
 
 If the results are empty or unhelpful, say so politely."""
 
+# Pre-split the templates once at import into fixed chunks around each slot.
+# Rendering is then a plain join — no format-spec parsing on every call.
+_PLANNER_PRE, _rest = PLANNER_PROMPT.split("{input}")
+_PLANNER_MID, _PLANNER_POST = _rest.split("{retry_hint}")
+_SUMMARISER_PRE, _rest = SUMMARISER_PROMPT.split("{input}")
+_SUMMARISER_MID, _SUMMARISER_POST = _rest.split("{retrieved_info}")
+del _rest
+
+
+def render_planner_prompt(user_input: str, retry_hint: str) -> str:
+    return "".join((_PLANNER_PRE, user_input, _PLANNER_MID, retry_hint, _PLANNER_POST))
+
+
+def render_summariser_prompt(user_input: str, retrieved_info: str) -> str:
+    return "".join((_SUMMARISER_PRE, user_input, _SUMMARISER_MID,
+                    retrieved_info, _SUMMARISER_POST))
+
 
 # ============================================================================
 # AGENT NODE FUNCTIONS
@@ -135,7 +254,7 @@ def planner_node(state: dict) -> dict:
         log_agent("PLANNER", f"hint: \"{retry_hint[:60]}…\"")
 
     plan = call_llm(
-        PLANNER_PROMPT.format(input=state["input"], retry_hint=retry_hint),
+        render_planner_prompt(state["input"], retry_hint),
         demo_fallback=(
             "Mars exploration 2025 latest news"
             if retries == 0 else
@@ -143,12 +262,6 @@ def planner_node(state: dict) -> dict:
         )
     )
     log_agent("PLANNER", f"query → \"{plan[:70]}\"")
-
-    if memory:
-        memory.save_context(
-            {"input": state["input"]},
-            {"output": f"[Planner] search query: {plan}"}
-        )
     return {"planner_output": plan, "step": "retrieve", "retries": retries}
 
 
@@ -157,6 +270,7 @@ def retriever_node(state: dict) -> dict:
     retries = state.get("retries", 0)
     log_agent("RETRIEVER", f"searching: \"{query[:55]}\"")
 
+    search = _get_search()
     if search:
         try:
             results = search.run(query)
@@ -178,47 +292,46 @@ def retriever_node(state: dict) -> dict:
             )
             log_agent("RETRIEVER", "demo: good result → will proceed")
 
-    if memory:
-        memory.save_context(
-            {"input": f"[Retriever] query: {query}"},
-            {"output": f"[Retriever] result: {results[:100]}…"}
-        )
     return {"retrieved_info": results, "step": "check"}
 
 
 def check_results_router(state: dict) -> str:
+    # Routers only pick the next node — LangGraph does not persist changes
+    # made to `state` here, so the bookkeeping lives in retry_node / give_up_node.
     results = state.get("retrieved_info", "")
     retries = state.get("retries", 0)
     is_failed = "[SEARCH_FAILED" in results or len(results.strip()) < 80
 
     if is_failed:
         if retries < MAX_RETRIES:
-            state["retries"]    = retries + 1
-            state["retry_hint"] = (
-                "The previous query did not return useful results. "
-                "Try a completely different angle or add more specific keywords."
-            )
             log_agent("ROUTER", f"bad results → retry #{retries + 1}")
-            return "planner"
+            return ROUTE_PLANNER
         else:
             log_agent("ROUTER", "max retries reached → giving up")
-            state["final_output"] = (
-                "I'm sorry — I wasn't able to find reliable information after "
-                "multiple attempts.  Please try rephrasing your question or "
-                "check a search engine directly."
-            )
-            return "end"
+            return ROUTE_END
     log_agent("ROUTER", "results OK → summarise")
-    return "summarize"
+    return ROUTE_SUMMARIZE
+
+
+def retry_node(state: dict) -> dict:
+    return {"retries": state.get("retries", 0) + 1, "retry_hint": RETRY_HINT}
+
+
+def give_up_node(state: dict) -> dict:
+    return {
+        "final_output": (
+            "I'm sorry — I wasn't able to find reliable information after "
+            "multiple attempts.  Please try rephrasing your question or "
+            "check a search engine directly."
+        ),
+        "step": "end",
+    }
 
 
 def summariser_node(state: dict) -> dict:
     log_agent("SUMMARISER", "synthesising …")
     answer = call_llm(
-        SUMMARISER_PROMPT.format(
-            input=state["input"],
-            retrieved_info=state["retrieved_info"]
-        ),
+        render_summariser_prompt(state["input"], state["retrieved_info"]),
         demo_fallback=(
             "Based on recent reports, NASA is preparing a new Mars rover "
             "mission for 2026 that will search for signs of past life. "
@@ -228,10 +341,13 @@ def summariser_node(state: dict) -> dict:
         )
     )
     log_agent("SUMMARISER", f"done ({len(answer)} chars)")
+    # Only successful runs reach the summariser, so record one consolidated
+    # turn here instead of a write per node on every retry.
+    memory = _get_memory()
     if memory:
         memory.save_context(
-            {"input": "[Summariser] synthesising"},
-            {"output": f"[Summariser] {answer[:100]}…"}
+            {"input": state["input"]},
+            {"output": answer}
         )
     return {"final_output": answer, "step": "end"}
 
@@ -240,11 +356,15 @@ def summariser_node(state: dict) -> dict:
 # BUILD THE LANGGRAPH  (or prepare manual fallback)
 # ============================================================================
 
-app = None
+@functools.cache
+def _get_app():
+    """Build and compile the graph on first use; None if LangGraph is missing."""
+    try:
+        from langgraph.graph import StateGraph, END
+    except ImportError:
+        return None   # will use manual fallback
 
-try:
     from typing import TypedDict
-    from langgraph.graph import StateGraph, END
 
     class AgentState(TypedDict, total=False):
         input:            str
@@ -259,69 +379,136 @@ try:
     graph.add_node("planner",   planner_node)
     graph.add_node("retrieve",  retriever_node)
     graph.add_node("summarize", summariser_node)
+    graph.add_node("retry",     retry_node)
+    graph.add_node("give_up",   give_up_node)
     graph.set_entry_point("planner")
     graph.add_edge("planner", "retrieve")
     graph.add_conditional_edges(
         "retrieve",
         check_results_router,
-        {"summarize": "summarize", "planner": "planner", "end": END}
+        {ROUTE_SUMMARIZE: "summarize", ROUTE_PLANNER: "retry", ROUTE_END: "give_up"}
     )
+    graph.add_edge("retry", "planner")
     graph.add_edge("summarize", END)
-    app = graph.compile()
+    graph.add_edge("give_up", END)
+
+    # Optional: persist graph state to SQLite (pip install langgraph-checkpoint-sqlite)
+    checkpointer = None
+    try:
+        import sqlite3
+        from langgraph.checkpoint.sqlite import SqliteSaver
+        os.makedirs(os.path.dirname(CHECKPOINT_DB), exist_ok=True)
+        checkpointer = SqliteSaver(sqlite3.connect(CHECKPOINT_DB, check_same_thread=False))
+    except ImportError:
+        pass
 
-except ImportError:
-    pass   # will use manual fallback
+    return graph.compile(checkpointer=checkpointer)
 
 
-def run_manual(input_text: str) -> dict:
+async def run_manual_async(input_text: str) -> dict:
+    """
+    Manual fallback: planner → retriever → router, looping on retries.
+
+    With SPECULATIVE_REPLAN on, the Planner's retry variant is prepared on
+    a second thread while the Retriever's (blocking) search is in flight,
+    so a retry goes straight back to retrieval.  Otherwise the retry plan
+    is only made once the router has rejected the results.
+    """
     state = {"input": input_text, "retries": 0, "retry_hint": ""}
+    state = {**state, **planner_node(state)}
     for _ in range(MAX_RETRIES + 2):
-        state = {**state, **planner_node(state)}
-        state = {**state, **retriever_node(state)}
+        retries = state.get("retries", 0)
+        retrieve_task = asyncio.to_thread(retriever_node, state)
+        if SPECULATIVE_REPLAN and retries < MAX_RETRIES:
+            retry_state = {**state, "retries": retries + 1, "retry_hint": RETRY_HINT}
+            retrieved, next_plan = await asyncio.gather(
+                retrieve_task, asyncio.to_thread(planner_node, retry_state)
+            )
+        else:
+            retrieved, next_plan = await retrieve_task, None
+
+        state = {**state, **retrieved}
         decision = check_results_router(state)
-        if decision == "summarize":
+        if decision is ROUTE_SUMMARIZE:
             state = {**state, **summariser_node(state)}
             break
-        elif decision == "end":
+        elif decision is ROUTE_END:
+            state = {**state, **give_up_node(state)}
             break
+        state = {**state, **retry_node(state)}
+        state = {**state, **(next_plan or planner_node(state))}
     return state
 
 
+def run_manual(input_text: str) -> dict:
+    return asyncio.run(run_manual_async(input_text))
+
+
 # ============================================================================
 # INTERACTIVE LOOP
 # ============================================================================
 
-def run_query(user_input: str) -> dict:
+def run_query(user_input: str, question_number: int) -> dict:
     """Run the full pipeline for one user question."""
+    app = _get_app()
     if app:
+        config = {"configurable": {"thread_id": f"{SESSION_ID}-q{question_number}"}}
         try:
-            return app.invoke({"input": user_input, "retries": 0, "retry_hint": ""})
+            if app.checkpointer is not None:
+                # Same question interrupted in an earlier run → resume it
+                saved = app.get_state(config)
+                if saved.next and saved.values.get("input") == user_input:
+                    print("  ⏯️   Resuming from checkpoint …\n")
+                    return app.invoke(None, config=config)
+            return app.invoke(
+                {"input": user_input, "retries": 0, "retry_hint": "",
+                 "final_output": ""},
+                config=config
+            )
         except Exception as e:
             print(f"\n  ❌  LangGraph error: {e}  — using manual fallback")
             return run_manual(user_input)
     return run_manual(user_input)
 
 
+def is_installed(package: str) -> bool:
+    """
+    True if the top-level `package` is installed, without importing it.
+    (For a dotted name find_spec WOULD import the parent packages, so
+    only top-level names are accepted here.)
+    """
+    if "." in package:
+        raise ValueError(f"top-level package name expected, got {package!r}")
+    return importlib.util.find_spec(package) is not None
+
+
 def show_memory():
     """Pretty-print the memory trace."""
-    if not memory or len(memory.chat_history) == 0:
+    memory = _get_memory()
+    if not memory or memory.size == 0:
         return
     print("\n  📝  Memory trace (this session):")
     print("  " + "─" * 66)
-    for i, msg in enumerate(memory.chat_history):
-        label = "You " if msg.type == "human" else "AI  "
-        print(f"    {i+1:>2}. [{label}] {msg.content[:90]}")
+    lines = memory.tail(MEMORY_DISPLAY_LIMIT)
+    first = memory.size - len(lines)
+    for i, line in enumerate(lines, first + 1):
+        print(f"    {i:>2}. {line[:97]}")
 
 
 def main():
     print_banner()
 
     mode_label = "LIVE (OpenAI + DuckDuckGo)" if HAS_KEY else "DEMO (simulated)"
-    graph_label = "LangGraph" if app else "Manual fallback"
+    has_langgraph = is_installed("langgraph")
+    # Only the top-level package is probed (nothing imported); whether
+    # langchain.memory itself imports is known on first use — see _get_memory()
+    has_memory = is_installed("langchain")
+    graph_label = "LangGraph" if has_langgraph else "Manual fallback"
 
     print(f"\n  Mode   : {mode_label}")
     print(f"  Engine : {graph_label}")
-    print(f"  Memory : {'✅  enabled' if memory else '🔧  not available'}")
+    print(f"  Memory : {'✅  langchain found (loaded on first answer)' if has_memory else '🔧  not available'}")
+    print(f"  Session: {SESSION_ID}")
     print(f"  Retries: up to {MAX_RETRIES}")
     print("\n  Type a question and press Enter.  Type 'quit' to exit.\n")
 
@@ -345,6 +532,7 @@ def main():
             show_memory()
             continue
         if user_input.lower() in ("clear", "reset"):
+            memory = _get_memory()
             if memory:
                 memory.clear()
             print("  🗑️   Memory cleared.\n")
@@ -366,7 +554,7 @@ def main():
         print(f"  🔄  Question #{question_number} — agents working …")
         print(f"  {'─' * 66}\n")
 
-        result = run_query(user_input)
+        result = run_query(user_input, question_number)
 
         # --- Show the answer ---
         print(f"\n  {'═' * 66}")
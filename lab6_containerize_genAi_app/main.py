@@ -1,6 +1,8 @@
 # main.py
 from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse
 import openai
+import orjson
 import os
 import logging
 
@@ -11,8 +13,8 @@ logger = logging.getLogger(__name__)
 # Read OpenAI API key from environment variable
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
-# Create FastAPI app
-app = FastAPI()
+# Create FastAPI app (orjson serializes responses in C instead of stdlib json)
+app = FastAPI(default_response_class=ORJSONResponse)
 
 @app.post("/generate")
 async def generate(request: Request):
@@ -21,7 +23,7 @@ async def generate(request: Request):
     """
     try:
         # 1. Parse request data
-        data = await request.json()
+        data = orjson.loads(await request.body())
         prompt = data.get("prompt", "Hello, world")
         
         # 2. Log the request
@@ -59,4 +61,13 @@ async def health_check():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # Several workers + uvloop/httptools: /generate is I/O-bound on OpenAI,
+    # so throughput scales with the number of worker processes.
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=4,
+        loop="uvloop",
+        http="httptools"
+    )
\ No newline at end of file
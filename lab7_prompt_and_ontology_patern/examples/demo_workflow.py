@@ -10,10 +10,15 @@ Run this to see the entire system in action!
 
 Usage:
     python examples/demo_workflow.py
+    python examples/demo_workflow.py --non-interactive      # no pauses, timed
+    python examples/demo_workflow.py --only 4               # just demo 4
 """
 
+import argparse
+import functools
 import sys
 import os
+import time
 
 # Add parent directory to path so we can import our modules
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -30,155 +35,144 @@ from src.prompt_generator import (
 )
 
 
-def print_section(title):
-    """Helper function to print section headers"""
-    print("\n" + "=" * 80)
-    print(f" {title}")
-    print("=" * 80 + "\n")
+def _emit(lines):
+    """Write a demo's buffered output in one go (one write + one flush)."""
+    sys.stdout.write("\n".join(lines) + "\n")
+    sys.stdout.flush()
 
 
-def demo_basic_retrieval():
-    """
-    Demo 1: Basic Knowledge Retrieval
-    
-    Shows how to query the ontology for facts.
-    """
-    print_section("DEMO 1: Basic Knowledge Retrieval")
-    
-    print("Question: What drugs treat Arthritis?")
-    print("\n[Querying ontology with SPARQL...]")
-    
-    drugs = query_drugs_for_disease("Arthritis")
+@functools.lru_cache(maxsize=32)
+def format_section(title):
+    """Build a section header banner (cached per title)"""
+    rule = "=" * 80
+    return "".join(("\n", rule, "\n ", title, "\n", rule, "\n\n"))
+
+
+# ========================================
+# DEMO STEPS
+# ========================================
+# Each demo is one retrieval call plus a formatter that turns its result
+# into output lines. main() walks the DEMOS table below.
+
+def _format_basic_retrieval(drugs):
+    """Demo 1: Basic Knowledge Retrieval - query the ontology for facts."""
+    out = [
+        "Question: What drugs treat Arthritis?",
+        "\n[Querying ontology with SPARQL...]"
+    ]
     
     if drugs:
-        print(f"\n✅ Found {len(drugs)} treatment(s):\n")
-        for drug in drugs:
-            print(f"  Drug: {drug.get('drugLabel')}")
-            print(f"  Mechanism: {drug.get('mechanismLabel')}")
-            print(f"  Dosage: {drug.get('dosage', 'Not specified')}")
-            print()
+        out.append(f"\n✅ Found {len(drugs)} treatment(s):\n")
+        out.extend([
+            f"  Drug: {drug.get('drugLabel')}\n"
+            f"  Mechanism: {drug.get('mechanismLabel')}\n"
+            f"  Dosage: {drug.get('dosage', 'Not specified')}\n"
+            for drug in drugs
+        ])
     else:
-        print("❌ No treatments found")
+        out.append("❌ No treatments found")
     
-    input("\nPress Enter to continue...")
+    return out
 
 
-def demo_rag_prompt_generation():
-    """
-    Demo 2: RAG Prompt Generation
-    
-    Shows how retrieval enhances AI prompts.
-    """
-    print_section("DEMO 2: RAG Prompt Generation")
-    
-    print("User Question: 'How can I treat Arthritis?'")
-    print("\n[Step 1] Retrieving knowledge from ontology...")
-    
-    result = generate_treatment_prompt("Arthritis")
+def _format_rag_prompt_generation(result):
+    """Demo 2: RAG Prompt Generation - how retrieval enhances AI prompts."""
+    out = [
+        "User Question: 'How can I treat Arthritis?'",
+        "\n[Step 1] Retrieving knowledge from ontology..."
+    ]
     
     if result['prompt']:
-        print("\n[Step 2] Knowledge retrieved:")
-        print(f"  - Primary drug: {result['context']['primary_drug']}")
-        print(f"  - Mechanism: {result['context']['mechanism']}")
-        
-        print("\n[Step 3] Generated Enhanced Prompt:")
-        print("-" * 80)
-        print(result['prompt'])
-        print("-" * 80)
-        
-        print("\n💡 This prompt would now be sent to an LLM (like GPT-4 or Claude)")
-        print("   The LLM's response will be grounded in real medical knowledge!")
+        out.extend([
+            "\n[Step 2] Knowledge retrieved:",
+            f"  - Primary drug: {result['context']['primary_drug']}",
+            f"  - Mechanism: {result['context']['mechanism']}",
+            "\n[Step 3] Generated Enhanced Prompt:",
+            "-" * 80,
+            result['prompt'],
+            "-" * 80,
+            "\n💡 This prompt would now be sent to an LLM (like GPT-4 or Claude)",
+            "   The LLM's response will be grounded in real medical knowledge!"
+        ])
     else:
-        print("❌ Failed to generate prompt")
+        out.append("❌ Failed to generate prompt")
     
-    input("\nPress Enter to continue...")
+    return out
 
 
-def demo_symptom_analysis():
-    """
-    Demo 3: Symptom Analysis
-    
-    Shows multi-entity retrieval.
-    """
-    print_section("DEMO 3: Symptom Analysis")
-    
-    print("Question: What are the symptoms of Diabetes?")
-    print("\n[Retrieving symptoms from ontology...]")
-    
-    symptoms = query_disease_symptoms("Diabetes")
+def _retrieve_symptoms_with_prompt(disease_name):
+    """Symptoms of a disease, plus the educational prompt if any were found."""
+    symptoms = query_disease_symptoms(disease_name)
+    prompt_result = generate_symptom_prompt(disease_name) if symptoms else None
+    return symptoms, prompt_result
+
+
+def _format_symptom_analysis(retrieved):
+    """Demo 3: Symptom Analysis - multi-entity retrieval."""
+    symptoms, result = retrieved
+    out = [
+        "Question: What are the symptoms of Diabetes?",
+        "\n[Retrieving symptoms from ontology...]"
+    ]
     
     if symptoms:
-        print(f"\n✅ Found {len(symptoms)} symptom(s):")
-        for symptom in symptoms:
-            print(f"  - {symptom.get('symptomLabel')}")
-        
-        print("\n[Generating educational prompt...]")
-        result = generate_symptom_prompt("Diabetes")
-        
-        print("\n" + "-" * 80)
-        print(result['prompt'])
-        print("-" * 80)
+        out.append(f"\n✅ Found {len(symptoms)} symptom(s):")
+        out.extend([f"  - {symptom.get('symptomLabel')}" for symptom in symptoms])
+        out.extend([
+            "\n[Generating educational prompt...]",
+            "\n" + "-" * 80,
+            result['prompt'],
+            "-" * 80
+        ])
     else:
-        print("❌ No symptoms found")
+        out.append("❌ No symptoms found")
     
-    input("\nPress Enter to continue...")
+    return out
 
 
-def demo_drug_comparison():
-    """
-    Demo 4: Drug Comparison
-    
-    Shows complex RAG pattern combining multiple retrievals.
-    """
-    print_section("DEMO 4: Drug Comparison")
-    
-    print("Question: How do Ibuprofen and Aspirin compare?")
-    print("\n[Retrieving details for both drugs...]")
-    
-    result = generate_drug_comparison_prompt("Ibuprofen", "Aspirin")
+def _format_drug_comparison(result):
+    """Demo 4: Drug Comparison - combining multiple retrievals."""
+    out = [
+        "Question: How do Ibuprofen and Aspirin compare?",
+        "\n[Retrieving details for both drugs...]"
+    ]
     
     if result['prompt']:
-        print("\n✅ Retrieved information for both drugs")
-        print("\n[Generated Comparison Prompt:]")
-        print("-" * 80)
-        print(result['prompt'])
-        print("-" * 80)
-        
-        print("\n📊 Context used:")
-        print(f"  Drug 1: {result['context']['drug1']['name']}")
-        print(f"    Treats: {', '.join(result['context']['drug1']['treats'])}")
-        print(f"  Drug 2: {result['context']['drug2']['name']}")
-        print(f"    Treats: {', '.join(result['context']['drug2']['treats'])}")
+        drug1 = result['context']['drug1']
+        drug2 = result['context']['drug2']
+        out.extend([
+            "\n✅ Retrieved information for both drugs",
+            "\n[Generated Comparison Prompt:]",
+            "-" * 80,
+            result['prompt'],
+            "-" * 80,
+            "\n📊 Context used:",
+            f"  Drug 1: {drug1['name']}",
+            f"    Treats: {', '.join(drug1['treats'])}",
+            f"  Drug 2: {drug2['name']}",
+            f"    Treats: {', '.join(drug2['treats'])}"
+        ])
     else:
-        print("❌ Failed to generate comparison")
+        out.append("❌ Failed to generate comparison")
     
-    input("\nPress Enter to continue...")
+    return out
 
 
-def demo_without_rag_vs_with_rag():
-    """
-    Demo 5: With vs Without RAG
-    
-    Shows the value of RAG by comparing approaches.
-    """
-    print_section("DEMO 5: The Value of RAG")
-    
-    print("User Question: 'How does Ibuprofen work for arthritis?'\n")
-    
-    print("❌ WITHOUT RAG (LLM alone):")
-    print("-" * 80)
-    print("""The LLM would generate a response based only on training data:
+def _format_rag_value(result):
+    """Demo 5: With vs Without RAG - the value of retrieval."""
+    return [
+        "User Question: 'How does Ibuprofen work for arthritis?'\n",
+        "❌ WITHOUT RAG (LLM alone):",
+        "-" * 80,
+        """The LLM would generate a response based only on training data:
 - Might be generic or outdated
 - Could include hallucinations
 - Not grounded in your specific knowledge base
-- No source attribution""")
-    print("-" * 80)
-    
-    print("\n✅ WITH RAG (Our System):")
-    print("-" * 80)
-    
-    result = generate_treatment_prompt("Arthritis")
-    print(f"""1. First, retrieve facts from knowledge base:
+- No source attribution""",
+        "-" * 80,
+        "\n✅ WITH RAG (Our System):",
+        "-" * 80,
+        f"""1. First, retrieve facts from knowledge base:
    - Drug: {result['context']['primary_drug']}
    - Mechanism: {result['context']['mechanism']}
 
@@ -189,71 +183,104 @@ def demo_without_rag_vs_with_rag():
    - Accurate and specific
    - Grounded in your ontology
    - Traceable to source
-   - Up-to-date with your data""")
-    print("-" * 80)
-    
-    input("\nPress Enter to continue...")
+   - Up-to-date with your data""",
+        "-" * 80
+    ]
 
 
-def demo_complete_workflow():
-    """
-    Demo 6: Complete RAG Workflow
-    
-    Shows the entire pipeline from user query to AI response.
-    """
-    print_section("DEMO 6: Complete RAG Workflow")
-    
+def _retrieve_drugs_with_prompt(disease_name):
+    """Drugs for a disease, plus the treatment prompt built from them."""
+    return query_drugs_for_disease(disease_name), generate_treatment_prompt(disease_name)
+
+
+def _format_complete_workflow(retrieved):
+    """Demo 6: Complete RAG Workflow - from user query to AI response."""
+    drugs, result = retrieved
     user_query = "I have joint pain. What medication might help?"
     
-    print(f"User Query: '{user_query}'")
-    print("\n📋 RAG PIPELINE:")
-    print("-" * 80)
-    
-    print("\n[Step 1] Understand Intent")
-    print("  → Identified: User wants treatment for joint pain")
-    print("  → Related disease: Arthritis (commonly causes joint pain)")
-    
-    print("\n[Step 2] RETRIEVE - Query Knowledge Base")
-    print("  → Querying ontology with SPARQL...")
-    
-    drugs = query_drugs_for_disease("Arthritis")
+    out = [
+        f"User Query: '{user_query}'",
+        "\n📋 RAG PIPELINE:",
+        "-" * 80,
+        "\n[Step 1] Understand Intent",
+        "  → Identified: User wants treatment for joint pain",
+        "  → Related disease: Arthritis (commonly causes joint pain)",
+        "\n[Step 2] RETRIEVE - Query Knowledge Base",
+        "  → Querying ontology with SPARQL..."
+    ]
     
     if drugs:
-        print(f"  ✅ Retrieved {len(drugs)} relevant treatment(s)")
-        for drug in drugs:
-            print(f"     - {drug.get('drugLabel')}: {drug.get('mechanismLabel')}")
-    
-    print("\n[Step 3] AUGMENT - Enhance Prompt")
-    print("  → Creating context-rich prompt...")
-    
-    result = generate_treatment_prompt("Arthritis")
-    
-    print("  ✅ Prompt enhanced with:")
-    print(f"     - Drug information: {result['context']['primary_drug']}")
-    print(f"     - Mechanism: {result['context']['mechanism']}")
-    print(f"     - Number of retrieved facts: {result['metadata']['num_treatments']}")
-    
-    print("\n[Step 4] GENERATE - Send to LLM")
-    print("  → Enhanced prompt ready for LLM")
-    print("  → LLM generates informed response")
-    
-    print("\n[Step 5] Return Response")
-    print("  → User receives accurate, grounded answer")
-    
-    print("\n" + "-" * 80)
-    print("\n💡 KEY BENEFITS OF RAG:")
-    print("  ✅ Reduces hallucinations")
-    print("  ✅ Grounds responses in real knowledge")
-    print("  ✅ Makes AI explainable and trustworthy")
-    print("  ✅ Easy to update knowledge without retraining")
-    
-    input("\nPress Enter to finish...")
+        out.append(f"  ✅ Retrieved {len(drugs)} relevant treatment(s)")
+        out.extend([f"     - {drug.get('drugLabel')}: {drug.get('mechanismLabel')}"
+                    for drug in drugs])
+    
+    out.extend([
+        "\n[Step 3] AUGMENT - Enhance Prompt",
+        "  → Creating context-rich prompt...",
+        "  ✅ Prompt enhanced with:",
+        f"     - Drug information: {result['context']['primary_drug']}",
+        f"     - Mechanism: {result['context']['mechanism']}",
+        f"     - Number of retrieved facts: {result['metadata']['num_treatments']}",
+        "\n[Step 4] GENERATE - Send to LLM",
+        "  → Enhanced prompt ready for LLM",
+        "  → LLM generates informed response",
+        "\n[Step 5] Return Response",
+        "  → User receives accurate, grounded answer",
+        "\n" + "-" * 80,
+        "\n💡 KEY BENEFITS OF RAG:",
+        "  ✅ Reduces hallucinations",
+        "  ✅ Grounds responses in real knowledge",
+        "  ✅ Makes AI explainable and trustworthy",
+        "  ✅ Easy to update knowledge without retraining"
+    ])
+    
+    return out
 
 
-def main():
+# (title, retrieval function, its arguments, formatter)
+DEMOS = [
+    ("DEMO 1: Basic Knowledge Retrieval", query_drugs_for_disease,
+     ("Arthritis",), _format_basic_retrieval),
+    ("DEMO 2: RAG Prompt Generation", generate_treatment_prompt,
+     ("Arthritis",), _format_rag_prompt_generation),
+    ("DEMO 3: Symptom Analysis", _retrieve_symptoms_with_prompt,
+     ("Diabetes",), _format_symptom_analysis),
+    ("DEMO 4: Drug Comparison", generate_drug_comparison_prompt,
+     ("Ibuprofen", "Aspirin"), _format_drug_comparison),
+    ("DEMO 5: The Value of RAG", generate_treatment_prompt,
+     ("Arthritis",), _format_rag_value),
+    ("DEMO 6: Complete RAG Workflow", _retrieve_drugs_with_prompt,
+     ("Arthritis",), _format_complete_workflow),
+]
+
+
+def parse_args(argv=None):
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="Healthcare RAG demo workflow")
+    parser.add_argument(
+        "--non-interactive",
+        action="store_true",
+        help="Run without pausing between demos and print per-demo timings "
+             "(for CI and benchmarking)"
+    )
+    parser.add_argument(
+        "--only",
+        type=int,
+        choices=range(1, len(DEMOS) + 1),
+        metavar=f"{{1..{len(DEMOS)}}}",
+        help="Run a single demo by number"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
     """
     Run the complete demo workflow.
     """
+    args = parse_args(argv)
+    interactive = not args.non_interactive
+    demos = [DEMOS[args.only - 1]] if args.only else DEMOS
+    
     print("\n" + "=" * 80)
     print(" HEALTHCARE RAG SYSTEM - Complete Demo")
     print("=" * 80)
@@ -276,18 +303,29 @@ def main():
     
     print("✅ Fuseki connection OK!")
     
-    input("\nPress Enter to start the demo...")
+    if interactive:
+        input("\nPress Enter to start the demo...")
     
-    # Run all demos
+    # Run the selected demos
     try:
-        demo_basic_retrieval()
-        demo_rag_prompt_generation()
-        demo_symptom_analysis()
-        demo_drug_comparison()
-        demo_without_rag_vs_with_rag()
-        demo_complete_workflow()
+        total_start = time.perf_counter()
+        
+        for i, (title, query_fn, query_args, fmt) in enumerate(demos, 1):
+            sys.stdout.write(format_section(title))
+            start = time.perf_counter()
+            _emit(fmt(query_fn(*query_args)))
+            
+            if interactive:
+                input("\nPress Enter to finish..." if i == len(demos)
+                      else "\nPress Enter to continue...")
+            else:
+                print(f"⏱️  {title}: {(time.perf_counter() - start) * 1000:.1f} ms")
+        
+        if not interactive:
+            print(f"\n⏱️  Total: {(time.perf_counter() - total_start) * 1000:.1f} ms "
+                  f"for {len(demos)} demo(s)")
         
-        print_section("Demo Complete!")
+        sys.stdout.write(format_section("Demo Complete!"))
         print("🎉 You've successfully completed the RAG demo!")
         print("\nNext steps:")
         print("  1. Try running the API server: uvicorn src.api_server:app --reload")
@@ -20,29 +20,51 @@ ENDPOINTS WE'LL CREATE:
 - GET /symptoms/{disease} - Get symptoms of a disease
 - GET /compare/{drug1}/{drug2} - Compare two drugs
 - POST /generate-prompt - Generate custom prompts
+- GET /cache/stats - Retrieval cache statistics
+- POST /cache/clear - Empty the retrieval cache
+- POST /admin/reload - Drop all cached data after an ontology reload
+- GET /metrics - Prometheus metrics (request latency, SPARQL timings, cache)
 """
 
-from fastapi import FastAPI, HTTPException, Query
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, ConfigDict
+from prometheus_client import multiprocess
+from prometheus_fastapi_instrumentator import Instrumentator
+from typing import Any, AsyncIterator, Callable, Optional, List, Dict
+import asyncio
+import hashlib
+import os
+import tempfile
+import time
+import orjson
 import uvicorn
 
 # Import our custom modules
+# (the query_* lookups come from prompt_generator: the same SPARQL
+# functions, wrapped in its TTL retrieval cache)
 from src.sparql_query import (
+    test_connection,
+    close_session,
+    query_all_drugs as query_all_drugs_uncached
+)
+from src.prompt_generator import (
     query_drugs_for_disease,
     query_disease_symptoms,
     query_drug_details,
     query_all_drugs,
-    test_connection
-)
-from src.prompt_generator import (
     generate_treatment_prompt,
     generate_symptom_prompt,
     generate_drug_comparison_prompt,
     generate_simple_prompt,
-    generate_discovery_prompt
+    generate_discovery_prompt,
+    invalidate_discovery_cache,
+    clear_cache,
+    get_cache_stats,
+    invalidate_all_caches,
+    on_cache_invalidated,
+    sync_cache_generation
 )
 
 
@@ -55,7 +77,8 @@ app = FastAPI(
     description="Retrieval-Augmented Generation API for Healthcare Knowledge",
     version="1.0.0",
     docs_url="/docs",  # Swagger UI at /docs
-    redoc_url="/redoc"  # ReDoc UI at /redoc
+    redoc_url="/redoc",  # ReDoc UI at /redoc
+    default_response_class=ORJSONResponse  # orjson: faster than stdlib json
 )
 
 # Enable CORS (allows requests from web browsers)
@@ -67,6 +90,147 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Prometheus metrics: per-endpoint request counts/latencies, plus the
+# SPARQL and cache metrics registered in sparql_query / prompt_generator.
+# Scrape them at GET /metrics
+# With several workers each process counts on its own; when
+# PROMETHEUS_MULTIPROC_DIR is set (see prepare_multiprocess_metrics) they
+# write their values there, and /metrics adds up all workers.
+Instrumentator().instrument(app).expose(app)
+
+
+def prepare_multiprocess_metrics() -> str:
+    """
+    Set up prometheus_client multiprocess mode for the worker processes.
+    
+    Must run before the workers start (they import prometheus_client with
+    this environment). Values left over from a previous run are removed,
+    otherwise they would be added to the new totals.
+    
+    Returns:
+        The metrics directory
+    """
+    metrics_dir = os.environ.setdefault(
+        "PROMETHEUS_MULTIPROC_DIR",
+        os.path.join(tempfile.gettempdir(), "healthcare_rag_metrics")
+    )
+    os.makedirs(metrics_dir, exist_ok=True)
+    for name in os.listdir(metrics_dir):
+        if name.endswith(".db"):
+            os.remove(os.path.join(metrics_dir, name))
+    return metrics_dir
+
+
+# ========================================
+# RESPONSE CACHE (ETag)
+# ========================================
+
+# /drugs and /discover return data that only changes when the ontology is
+# reloaded. Their JSON bodies are kept in memory with an ETag, so a repeat
+# request is a dict lookup, and a client that sends If-None-Match gets an
+# empty 304 response.
+RESPONSE_MAX_AGE = 300  # seconds
+
+_response_cache: Dict[str, Dict] = {}
+
+# Emptied together with the retrieval caches, in every worker
+# (see prompt_generator.invalidate_all_caches)
+on_cache_invalidated(_response_cache.clear)
+
+
+def _store_response(key: str, body: dict) -> Dict:
+    """Cache a response body under `key` together with its ETag."""
+    payload = orjson.dumps(body, option=orjson.OPT_SORT_KEYS)
+    entry = {
+        'etag': f'"{hashlib.sha1(payload).hexdigest()}"',
+        'body': body,
+        'ts': time.monotonic()
+    }
+    _response_cache[key] = entry
+    return entry
+
+
+def _get_cached_response(key: str) -> Optional[Dict]:
+    """Return the cached entry for `key`, or None if missing or stale."""
+    sync_cache_generation()
+    entry = _response_cache.get(key)
+    if entry and time.monotonic() - entry['ts'] < RESPONSE_MAX_AGE:
+        return entry
+    return None
+
+
+def _cached_json_response(
+    request: Request,
+    entry: Dict,
+    stream: Optional[Callable[[Dict], AsyncIterator[bytes]]] = None
+) -> Response:
+    """
+    Build a JSON (or 304 Not Modified) response with caching headers.
+    
+    Args:
+        request: Incoming request (checked for If-None-Match)
+        entry: Cache entry from _store_response()
+        stream: Optional generator factory; if given, the body is sent
+            as a StreamingResponse instead of one serialized blob
+    """
+    headers = {
+        'ETag': entry['etag'],
+        'Cache-Control': f'max-age={RESPONSE_MAX_AGE}'
+    }
+    if request.headers.get('if-none-match') == entry['etag']:
+        return Response(status_code=304, headers=headers)
+    if stream is not None:
+        return StreamingResponse(
+            stream(entry['body']),
+            media_type="application/json",
+            headers=headers
+        )
+    return ORJSONResponse(entry['body'], headers=headers)
+
+
+# Drugs serialized per streamed chunk (one chunk per drug would mean
+# many tiny writes; one chunk for all of them would mean no streaming)
+STREAM_CHUNK_SIZE = 256
+
+
+async def _stream_drugs(body: Dict) -> AsyncIterator[bytes]:
+    """Yield the /drugs JSON body piece by piece: header, drug chunks, footer."""
+    drugs = body['drugs']
+    yield b'{"total":%d,"drugs":[' % body['total']
+    for start in range(0, len(drugs), STREAM_CHUNK_SIZE):
+        chunk = b','.join(
+            orjson.dumps(d) for d in drugs[start:start + STREAM_CHUNK_SIZE]
+        )
+        yield (b',' if start else b'') + chunk
+    yield b']}'
+
+
+# ========================================
+# CACHE WARMING
+# ========================================
+
+# Diseases whose prompts are generated in the background at startup, so
+# the first real request for them hits a warm retrieval cache.
+# Override with e.g. COMMON_DISEASES="Arthritis,Diabetes,Hypertension"
+COMMON_DISEASES = [
+    d.strip()
+    for d in os.getenv("COMMON_DISEASES", "Arthritis,Diabetes").split(",")
+    if d.strip()
+]
+
+# Keep a reference so the background task is not garbage-collected
+_warm_task: Optional[asyncio.Task] = None
+
+
+async def _warm_cache() -> None:
+    """Generate treatment prompts for COMMON_DISEASES in parallel."""
+    results = await asyncio.gather(
+        *[asyncio.to_thread(generate_treatment_prompt, d) for d in COMMON_DISEASES],
+        return_exceptions=True
+    )
+    warmed = sum(1 for r in results if isinstance(r, dict) and r.get('prompt'))
+    print(f"🔥 Cache warmed: {warmed}/{len(COMMON_DISEASES)} common diseases")
+
 
 # ========================================
 # REQUEST/RESPONSE MODELS
@@ -78,17 +242,18 @@ class PromptRequest(BaseModel):
     
     This defines what data the client must send when requesting a prompt.
     """
-    user_question: str
-    disease_name: Optional[str] = None
-    drug_name: Optional[str] = None
-    
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "user_question": "How does Ibuprofen help with pain?",
                 "disease_name": "Arthritis"
             }
         }
+    )
+    
+    user_question: str
+    disease_name: Optional[str] = None
+    drug_name: Optional[str] = None
 
 
 class PromptResponse(BaseModel):
@@ -98,14 +263,18 @@ class PromptResponse(BaseModel):
     This defines what data the API will return.
     """
     prompt: Optional[str]
-    context: Optional[dict]
-    metadata: dict
+    context: Optional[Dict[str, Any]]
+    metadata: Dict[str, Any]
 
 
 # ========================================
 # API ENDPOINTS
 # ========================================
 
+# The SPARQL helpers use blocking HTTP calls. Inside these async endpoints
+# they run in worker threads (asyncio.to_thread) so one slow query does
+# not stall the event loop for every other request.
+
 @app.get("/")
 async def root():
     """
@@ -123,7 +292,11 @@ async def root():
             "treatment": "/treatment/{disease}",
             "symptoms": "/symptoms/{disease}",
             "compare": "/compare/{drug1}/{drug2}",
-            "generate": "/generate-prompt"
+            "generate": "/generate-prompt",
+            "cache_stats": "/cache/stats",
+            "cache_clear": "/cache/clear",
+            "admin_reload": "/admin/reload",
+            "metrics": "/metrics"
         }
     }
 
@@ -140,11 +313,13 @@ async def health_check():
     
     Try it: http://localhost:8000/health
     """
-    # Test connection to Fuseki
-    fuseki_ok = test_connection()
-    
-    # Test ontology query
-    drugs = query_all_drugs()
+    # Test connection to Fuseki and query the ontology at the same time,
+    # both in worker threads so the event loop is not blocked.
+    # The probe must hit Fuseki itself, not the TTL retrieval cache.
+    fuseki_ok, drugs = await asyncio.gather(
+        asyncio.to_thread(test_connection),
+        asyncio.to_thread(query_all_drugs_uncached)
+    )
     ontology_ok = len(drugs) > 0
     
     status = "healthy" if (fuseki_ok and ontology_ok) else "degraded"
@@ -158,27 +333,36 @@ async def health_check():
 
 
 @app.get("/drugs")
-async def get_all_drugs():
+async def get_all_drugs(request: Request):
     """
     List all drugs in the knowledge base.
     
+    The response is cached and carries an ETag / Cache-Control header.
+    The body is streamed in chunks, so clients get the first bytes
+    before the whole list is serialized.
+    
     Returns:
         List of drugs with basic information
     
     Try it: http://localhost:8000/drugs
     """
-    drugs = query_all_drugs()
+    entry = _get_cached_response("drugs")
     
-    if not drugs:
-        raise HTTPException(
-            status_code=404,
-            detail="No drugs found in knowledge base. Check if ontology is loaded."
-        )
+    if entry is None:
+        drugs = await asyncio.to_thread(query_all_drugs)
+        
+        if not drugs:
+            raise HTTPException(
+                status_code=404,
+                detail="No drugs found in knowledge base. Check if ontology is loaded."
+            )
+        
+        entry = _store_response("drugs", {
+            "total": len(drugs),
+            "drugs": drugs
+        })
     
-    return {
-        "total": len(drugs),
-        "drugs": drugs
-    }
+    return _cached_json_response(request, entry, stream=_stream_drugs)
 
 
 @app.get("/treatment/{disease}")
@@ -196,7 +380,7 @@ async def get_treatment_info(disease: str):
     
     Try it: http://localhost:8000/treatment/Arthritis
     """
-    result = generate_treatment_prompt(disease)
+    result = await asyncio.to_thread(generate_treatment_prompt, disease)
     
     if not result['prompt']:
         raise HTTPException(
@@ -217,7 +401,7 @@ async def get_symptom_info(disease: str):
     
     Try it: http://localhost:8000/symptoms/Diabetes
     """
-    result = generate_symptom_prompt(disease)
+    result = await asyncio.to_thread(generate_symptom_prompt, disease)
     
     if not result['prompt']:
         raise HTTPException(
@@ -239,7 +423,7 @@ async def compare_drugs(drug1: str, drug2: str):
     
     Try it: http://localhost:8000/compare/Ibuprofen/Aspirin
     """
-    result = generate_drug_comparison_prompt(drug1, drug2)
+    result = await asyncio.to_thread(generate_drug_comparison_prompt, drug1, drug2)
     
     if not result['prompt']:
         raise HTTPException(
@@ -260,7 +444,7 @@ async def get_drug_details(drug_name: str):
     
     Try it: http://localhost:8000/drug/Ibuprofen
     """
-    details = query_drug_details(drug_name)
+    details = await asyncio.to_thread(query_drug_details, drug_name)
     
     if not details:
         raise HTTPException(
@@ -289,7 +473,8 @@ async def generate_custom_prompt(request: PromptRequest):
     """
     if request.disease_name:
         # If disease specified, use treatment prompt
-        prompt = generate_simple_prompt(
+        prompt = await asyncio.to_thread(
+            generate_simple_prompt,
             request.user_question,
             request.disease_name
         )
@@ -307,21 +492,32 @@ async def generate_custom_prompt(request: PromptRequest):
     
     else:
         # No specific disease - return discovery prompt
-        result = generate_discovery_prompt()
+        result = await asyncio.to_thread(generate_discovery_prompt)
         return result
 
 
 @app.get("/discover")
-async def discover_knowledge():
+async def discover_knowledge(request: Request):
     """
     Discover what's available in the knowledge base.
     
     Useful for exploratory queries or showing capabilities.
+    The response is cached and carries an ETag / Cache-Control header.
     
     Try it: http://localhost:8000/discover
     """
-    result = generate_discovery_prompt()
-    return result
+    entry = _get_cached_response("discover")
+    
+    if entry is None:
+        result = await asyncio.to_thread(generate_discovery_prompt)
+        
+        # Don't cache the "knowledge base is empty" answer
+        if not result['context']:
+            return result
+        
+        entry = _store_response("discover", result)
+    
+    return _cached_json_response(request, entry)
 
 
 @app.get("/query-raw")
@@ -339,11 +535,11 @@ async def raw_query(
     Try it: http://localhost:8000/query-raw?disease=Arthritis
     """
     if disease:
-        drugs = query_drugs_for_disease(disease)
+        drugs = await asyncio.to_thread(query_drugs_for_disease, disease)
         return {"query_type": "disease", "disease": disease, "results": drugs}
     
     elif drug:
-        details = query_drug_details(drug)
+        details = await asyncio.to_thread(query_drug_details, drug)
         return {"query_type": "drug", "drug": drug, "results": details}
     
     else:
@@ -353,6 +549,48 @@ async def raw_query(
         )
 
 
+@app.get("/cache/stats")
+async def cache_stats():
+    """
+    Show retrieval cache statistics (size, hits, misses, hit ratio).
+    
+    With several workers these are the numbers of the worker that answers
+    (see "pid"); /metrics has the totals over all workers.
+    
+    Try it: http://localhost:8000/cache/stats
+    """
+    return {**get_cache_stats(), "pid": os.getpid()}
+
+
+@app.post("/cache/clear")
+async def cache_clear():
+    """
+    Empty the caches, e.g. after uploading a new ontology.
+    
+    Same as /admin/reload: one worker receives the POST, and the shared
+    invalidation reaches every worker.
+    
+    Try it: curl -X POST http://localhost:8000/cache/clear
+    """
+    invalidate_all_caches()
+    return {"status": "cleared"}
+
+
+@app.post("/admin/reload")
+async def admin_reload():
+    """
+    Drop every cached response, retrieval result and the discovery prompt.
+    
+    Call this after uploading a new version of the ontology to Fuseki.
+    Every worker process drops its caches (on its next cache read), not
+    only the one that receives this request.
+    
+    Try it: curl -X POST http://localhost:8000/admin/reload
+    """
+    invalidate_all_caches()
+    return {"status": "reloaded"}
+
+
 # ========================================
 # STARTUP/SHUTDOWN EVENTS
 # ========================================
@@ -367,11 +605,18 @@ async def startup_event():
     - Load resources
     - Initialize services
     """
+    global _warm_task
+    
     print("=" * 60)
     print("🚀 Healthcare RAG API Starting...")
     print("=" * 60)
     
-    # Test Fuseki connection
+    # Start from an empty retrieval cache, at the current shared generation
+    clear_cache()
+    invalidate_discovery_cache()
+    sync_cache_generation()
+    
+    # Test Fuseki connection (this also opens the first pooled connection)
     if test_connection():
         print("✅ Fuseki connection: OK")
         
@@ -379,6 +624,13 @@ async def startup_event():
         drugs = query_all_drugs()
         if drugs:
             print(f"✅ Ontology loaded: {len(drugs)} drugs found")
+            _store_response("drugs", {"total": len(drugs), "drugs": drugs})
+            
+            # Render the discovery prompt once, so /discover is a lookup
+            generate_discovery_prompt()
+            
+            # Warm the caches for common diseases without delaying startup
+            _warm_task = asyncio.create_task(_warm_cache())
         else:
             print("⚠️  Warning: Ontology appears empty")
     else:
@@ -401,6 +653,13 @@ async def shutdown_event():
     - Cleanup resources
     """
     print("\n👋 Healthcare RAG API shutting down...")
+    
+    # Release the pooled connections to Fuseki
+    close_session()
+    
+    # Multiprocess metrics: this worker's live values no longer count
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(os.getpid())
 
 
 # ========================================
@@ -414,13 +673,27 @@ if __name__ == "__main__":
     Usage:
         python src/api_server.py
     
-    Or use uvicorn directly:
+    Runs one worker per CPU core, with uvloop as the event loop (where it
+    is available - not on Windows) and httptools as the HTTP parser; both
+    come with uvicorn[standard]. Each worker keeps its own in-memory
+    caches; /admin/reload and /cache/clear invalidate them in all workers
+    through a shared generation file (RAG_CACHE_GENERATION_FILE), and
+    /metrics reports the sum over all workers (prometheus_client
+    multiprocess mode).
+    
+    For development with auto-reload, use uvicorn directly:
         uvicorn src.api_server:app --reload
+    (running uvicorn with --workers N yourself: export
+    PROMETHEUS_MULTIPROC_DIR=<empty directory> first, or /metrics only
+    shows the worker that answers the scrape)
     """
+    prepare_multiprocess_metrics()
     uvicorn.run(
         "api_server:app",
         host="0.0.0.0",  # Listen on all network interfaces
         port=8000,
-        reload=True,  # Auto-reload on code changes
+        workers=os.cpu_count(),  # One worker process per CPU core
+        loop="auto",  # uvloop if installed (faster than stdlib asyncio)
+        http="httptools",  # Faster HTTP parser than h11
         log_level="info"
-    )
\ No newline at end of file
+    )
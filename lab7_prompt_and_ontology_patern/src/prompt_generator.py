@@ -15,64 +15,320 @@ WHY THIS MATTERS:
 - Makes responses explainable and trustworthy
 """
 
-from typing import Dict, List, Optional
-from src.sparql_query import (
-    query_drugs_for_disease,
-    query_disease_symptoms,
-    query_drug_details,
-    query_all_drugs
+import functools
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from string import Template
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from prometheus_client import Counter
+from src import sparql_query
+
+
+# ========================================
+# RETRIEVAL CACHE
+# ========================================
+
+# The ontology rarely changes, but every prompt used to re-query Fuseki.
+# Caching the SPARQL-backed lookups turns a repeated request into a dict
+# lookup instead of an HTTP + SPARQL round-trip.
+CACHE_MAXSIZE = 512
+CACHE_TTL_SECONDS = 60
+
+# Empty results (unknown or misspelled names) are cached too, but only
+# briefly: repeated misses don't reach Fuseki, and data that appears
+# after an upload is picked up quickly.
+NEGATIVE_CACHE_TTL_SECONDS = 30
+
+
+class TTLCache:
+    """
+    Small thread-safe LRU cache whose entries expire after a TTL.
+    
+    Args:
+        maxsize: Maximum number of entries (least recently used is evicted)
+        ttl: Default lifetime of an entry in seconds
+    """
+    
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0  # hits on a cached empty result
+        self._data: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.RLock()
+    
+    def get(self, key: Tuple) -> Tuple[bool, Any]:
+        """Return (found, value); expired entries count as misses."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    if not value:
+                        self.negative_hits += 1
+                    return True, value
+                del self._data[key]
+            self.misses += 1
+            return False, None
+    
+    def set(self, key: Tuple, value: Any, ttl: Optional[float] = None) -> None:
+        """Store `value`; `ttl` overrides the default lifetime."""
+        with self._lock:
+            expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+            self.negative_hits = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'negative_hits': self.negative_hits,
+                'hit_ratio': self.hits / total if total else 0.0
+            }
+
+
+_retrieval_cache = TTLCache(maxsize=CACHE_MAXSIZE, ttl=CACHE_TTL_SECONDS)
+
+# Prometheus counters for the retrieval cache (exposed on /metrics)
+CACHE_HITS = Counter('rag_cache_hits_total', 'Retrieval cache hits')
+CACHE_MISSES = Counter('rag_cache_misses_total', 'Retrieval cache misses')
+NEGATIVE_CACHE_HITS = Counter(
+    'rag_negative_cache_hits_total',
+    'Retrieval cache hits on a cached empty result'
 )
 
 
+def _normalize(arg: Any) -> Any:
+    """Strip strings; turn lists of names into hashable tuples."""
+    if isinstance(arg, str):
+        return arg.strip()
+    if isinstance(arg, (list, tuple)):
+        return tuple(_normalize(a) for a in arg)
+    return arg
+
+
+def _fresh_copy(value: Any) -> Any:
+    """
+    Copy a cached result (nested lists / dicts of plain values).
+    
+    Every caller gets its own copy, so one caller modifying the result
+    cannot change what later cache hits return.
+    """
+    if isinstance(value, dict):
+        return {k: _fresh_copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_fresh_copy(v) for v in value]
+    return value
+
+
+def cached(func: Callable) -> Callable:
+    """
+    Cache a SPARQL query function in the retrieval cache.
+    
+    The key is (function name, arguments), with string arguments stripped
+    of surrounding whitespace. Names are NOT lower-cased: they become
+    case-sensitive IRI local names in the SPARQL query.
+    Empty results are cached for NEGATIVE_CACHE_TTL_SECONDS only, since
+    they may also come from a failed request.
+    Callers always receive a copy of the cached value (see _fresh_copy).
+    """
+    @functools.wraps(func)
+    def wrapper(*args):
+        sync_cache_generation()
+        args = tuple(_normalize(a) for a in args)
+        key = (func.__name__,) + args
+        found, value = _retrieval_cache.get(key)
+        if found:
+            CACHE_HITS.inc()
+            if not value:
+                NEGATIVE_CACHE_HITS.inc()
+            return _fresh_copy(value)
+        CACHE_MISSES.inc()
+        value = func(*args)
+        _retrieval_cache.set(
+            key, value, ttl=None if value else NEGATIVE_CACHE_TTL_SECONDS
+        )
+        return _fresh_copy(value)
+    return wrapper
+
+
+query_drugs_for_disease = cached(sparql_query.query_drugs_for_disease)
+query_disease_symptoms = cached(sparql_query.query_disease_symptoms)
+query_drug_details = cached(sparql_query.query_drug_details)
+query_drug_details_batch = cached(sparql_query.query_drug_details_batch)
+query_all_drugs = cached(sparql_query.query_all_drugs)
+
+
+def clear_cache() -> None:
+    """Drop every cached retrieval result (e.g. after reloading the ontology)."""
+    _retrieval_cache.clear()
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Return size and hit/miss/negative-hit counters of the retrieval cache."""
+    return _retrieval_cache.stats()
+
+
+# ========================================
+# CACHE INVALIDATION ACROSS WORKERS
+# ========================================
+
+# The API server runs several worker processes, each with its own
+# in-memory caches, and a POST only reaches one of them. Invalidation is
+# therefore recorded in a file shared by all workers: its modification
+# time is the cache "generation". Every cache read compares it (one
+# stat() call) with the generation this worker last saw, and drops the
+# local caches if another worker has bumped it.
+CACHE_GENERATION_FILE = os.getenv(
+    "RAG_CACHE_GENERATION_FILE",
+    os.path.join(tempfile.gettempdir(), "healthcare_rag_cache.generation")
+)
+
+_seen_generation: Optional[int] = None
+_generation_lock = threading.Lock()
+_invalidation_callbacks: List[Callable[[], None]] = []
+
+
+def on_cache_invalidated(callback: Callable[[], None]) -> None:
+    """Register a function that empties another local cache on invalidation."""
+    _invalidation_callbacks.append(callback)
+
+
+def _read_generation() -> int:
+    try:
+        return os.stat(CACHE_GENERATION_FILE).st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+def _clear_local_caches() -> None:
+    clear_cache()
+    invalidate_discovery_cache()
+    for callback in _invalidation_callbacks:
+        callback()
+
+
+def sync_cache_generation() -> None:
+    """Drop this worker's caches if another worker invalidated them."""
+    global _seen_generation
+    generation = _read_generation()
+    if generation == _seen_generation:
+        return
+    with _generation_lock:
+        if generation != _seen_generation:
+            if _seen_generation is not None:
+                _clear_local_caches()
+            _seen_generation = generation
+
+
+def invalidate_all_caches() -> None:
+    """
+    Drop every cache in every worker (e.g. after reloading the ontology).
+    
+    This worker is cleared right away; the others on their next cache read.
+    """
+    global _seen_generation
+    with _generation_lock:
+        with open(CACHE_GENERATION_FILE, 'a'):
+            pass
+        now = time.time_ns()
+        os.utime(CACHE_GENERATION_FILE, ns=(now, now))
+        _clear_local_caches()
+        _seen_generation = _read_generation()
+
+
 # ========================================
 # PROMPT TEMPLATES
 # ========================================
 
+# Templates are compiled once at import (string.Template, $placeholders);
+# filling one in is a plain substitution, with no format-spec parsing.
+
 # Template for drug treatment explanation
-DRUG_TREATMENT_TEMPLATE = """You are a knowledgeable medical assistant. Based on the following verified information from our medical knowledge base:
+DRUG_TREATMENT_TEMPLATE = Template("""You are a knowledgeable medical assistant. Based on the following verified information from our medical knowledge base:
 
-Drug: {drug_name}
-Treats: {diseases}
-Mechanism of Action: {mechanism}
-Typical Dosage: {dosage}
+Drug: $drug_name
+Treats: $diseases
+Mechanism of Action: $mechanism
+Typical Dosage: $dosage
 
 Please explain in clear, simple terms:
-1. How {drug_name} works to treat {primary_disease}
-2. Why the {mechanism} mechanism is effective
+1. How $drug_name works to treat $primary_disease
+2. Why the $mechanism mechanism is effective
 3. What patients should know about taking this medication
 
-Keep the explanation accessible to non-medical professionals."""
+Keep the explanation accessible to non-medical professionals.""")
 
 
-SYMPTOM_ANALYSIS_TEMPLATE = """You are a medical education assistant. Based on our knowledge base:
+SYMPTOM_ANALYSIS_TEMPLATE = Template("""You are a medical education assistant. Based on our knowledge base:
 
-Disease: {disease_name}
-Known Symptoms: {symptoms}
+Disease: $disease_name
+Known Symptoms: $symptoms
 
 Please explain:
-1. Why these symptoms occur with {disease_name}
+1. Why these symptoms occur with $disease_name
 2. How they relate to the underlying condition
 3. When someone should seek medical attention
 
-Use simple, clear language suitable for patient education."""
+Use simple, clear language suitable for patient education.""")
 
 
-DRUG_COMPARISON_TEMPLATE = """You are a pharmaceutical education assistant. Based on our knowledge base:
+DRUG_COMPARISON_TEMPLATE = Template("""You are a pharmaceutical education assistant. Based on our knowledge base:
 
-Drug 1: {drug1_name}
-- Treats: {drug1_treats}
-- Mechanism: {drug1_mechanism}
+Drug 1: $drug1_name
+- Treats: $drug1_treats
+- Mechanism: $drug1_mechanism
 
-Drug 2: {drug2_name}
-- Treats: {drug2_treats}
-- Mechanism: {drug2_mechanism}
+Drug 2: $drug2_name
+- Treats: $drug2_treats
+- Mechanism: $drug2_mechanism
 
 Please compare these medications:
 1. Similarities in what they treat
 2. Differences in how they work
 3. Considerations for choosing between them
 
-Provide an objective, educational comparison."""
+Provide an objective, educational comparison.""")
+
+# Template for knowledge-base discovery.
+# The static instructions come first and the drug list last, so LLM
+# prompt caching (which matches on a shared prefix) can reuse the static part.
+DISCOVERY_TEMPLATE = Template("""You are a medical information assistant with access to a knowledge base of medications.
+
+Available information includes:
+- What conditions each medication treats
+- How the medications work (mechanism of action)
+- Typical dosages
+
+The knowledge base contains the following medications:
+
+$drug_list
+
+How can I help you learn about these medications?""")
+
+# Rendered discovery prompt. It only changes when the ontology is reloaded,
+# so it is built once and reused until invalidate_discovery_cache() is called.
+_DISCOVERY_PROMPT_CACHE: Optional[Dict[str, Any]] = None
 
 
 # ========================================
@@ -105,15 +361,22 @@ def generate_treatment_prompt(disease_name: str) -> Dict[str, any]:
             'metadata': {'error': f'No treatment found for {disease_name}'}
         }
     
-    # Use the first drug as primary treatment
+    # Use the first drug as primary treatment (read its fields once)
     primary_drug = drugs[0]
+    label = primary_drug.get('drugLabel', 'Unknown')
+    mechanism = primary_drug.get('mechanismLabel', 'Unknown mechanism')
+    dosage = primary_drug.get('dosage', 'Consult healthcare provider')
+    
+    # Rows from query_drugs_for_disease() normally carry no diseaseLabel;
+    # fall back to the disease that was asked about
+    diseases = ', '.join(d['diseaseLabel'] for d in drugs if 'diseaseLabel' in d)
     
     # STEP 2: AUGMENT - Build context-rich prompt
-    prompt = DRUG_TREATMENT_TEMPLATE.format(
-        drug_name=primary_drug.get('drugLabel', 'Unknown'),
-        diseases=', '.join([d.get('diseaseLabel', '') for d in drugs]),
-        mechanism=primary_drug.get('mechanismLabel', 'Unknown mechanism'),
-        dosage=primary_drug.get('dosage', 'Consult healthcare provider'),
+    prompt = DRUG_TREATMENT_TEMPLATE.substitute(
+        drug_name=label,
+        diseases=diseases or disease_name,
+        mechanism=mechanism,
+        dosage=dosage,
         primary_disease=disease_name
     )
     
@@ -122,8 +385,8 @@ def generate_treatment_prompt(disease_name: str) -> Dict[str, any]:
         'prompt': prompt,
         'context': {
             'retrieved_drugs': drugs,
-            'primary_drug': primary_drug.get('drugLabel'),
-            'mechanism': primary_drug.get('mechanismLabel')
+            'primary_drug': label,
+            'mechanism': mechanism
         },
         'metadata': {
             'disease': disease_name,
@@ -157,7 +420,7 @@ def generate_symptom_prompt(disease_name: str) -> Dict[str, any]:
     # AUGMENT with structured context
     symptom_list = ', '.join([s.get('symptomLabel', '') for s in symptoms])
     
-    prompt = SYMPTOM_ANALYSIS_TEMPLATE.format(
+    prompt = SYMPTOM_ANALYSIS_TEMPLATE.substitute(
         disease_name=disease_name,
         symptoms=symptom_list
     )
@@ -189,9 +452,10 @@ def generate_drug_comparison_prompt(drug1_name: str, drug2_name: str) -> Dict[st
         Dictionary with comparison prompt
     """
     
-    # RETRIEVE details for both drugs
-    drug1_info = query_drug_details(drug1_name)
-    drug2_info = query_drug_details(drug2_name)
+    # RETRIEVE details for both drugs (one SPARQL round-trip)
+    details = query_drug_details_batch([drug1_name, drug2_name])
+    drug1_info = details.get(drug1_name.strip(), {})
+    drug2_info = details.get(drug2_name.strip(), {})
     
     if not drug1_info or not drug2_info:
         return {
@@ -201,7 +465,7 @@ def generate_drug_comparison_prompt(drug1_name: str, drug2_name: str) -> Dict[st
         }
     
     # AUGMENT with comparative context
-    prompt = DRUG_COMPARISON_TEMPLATE.format(
+    prompt = DRUG_COMPARISON_TEMPLATE.substitute(
         drug1_name=drug1_name,
         drug1_treats=', '.join(drug1_info.get('treats', [])),
         drug1_mechanism=drug1_info.get('mechanism', 'Unknown'),
@@ -262,15 +526,23 @@ def generate_discovery_prompt() -> Dict[str, any]:
     Generate a prompt for exploring what's in the knowledge base.
     
     Useful for open-ended queries like "What can you tell me about medications?"
+    The result is cached in memory until invalidate_discovery_cache() or
+    invalidate_all_caches() (in any worker) is called.
     
     Returns:
         Dictionary with discovery prompt
     """
+    global _DISCOVERY_PROMPT_CACHE
+    
+    sync_cache_generation()
+    if _DISCOVERY_PROMPT_CACHE is not None:
+        return _fresh_copy(_DISCOVERY_PROMPT_CACHE)
     
     # RETRIEVE all available drugs
     all_drugs = query_all_drugs()
     
     if not all_drugs:
+        # Not cached: the ontology may simply not be loaded yet
         return {
             'prompt': 'The knowledge base appears to be empty.',
             'context': None,
@@ -279,19 +551,8 @@ def generate_discovery_prompt() -> Dict[str, any]:
     
     drug_list = ', '.join([d.get('drugLabel', '') for d in all_drugs])
     
-    prompt = f"""You are a medical information assistant with access to a knowledge base containing information about the following medications:
-
-{drug_list}
-
-Available information includes:
-- What conditions each medication treats
-- How the medications work (mechanism of action)
-- Typical dosages
-
-How can I help you learn about these medications?"""
-    
-    return {
-        'prompt': prompt,
+    _DISCOVERY_PROMPT_CACHE = {
+        'prompt': DISCOVERY_TEMPLATE.substitute(drug_list=drug_list),
         'context': {
             'available_drugs': all_drugs,
             'total_count': len(all_drugs)
@@ -300,6 +561,13 @@ How can I help you learn about these medications?"""
             'rag_pattern': 'knowledge_discovery'
         }
     }
+    return _fresh_copy(_DISCOVERY_PROMPT_CACHE)
+
+
+def invalidate_discovery_cache() -> None:
+    """Forget the cached discovery prompt (e.g. after reloading the ontology)."""
+    global _DISCOVERY_PROMPT_CACHE
+    _DISCOVERY_PROMPT_CACHE = None
 
 
 # ========================================
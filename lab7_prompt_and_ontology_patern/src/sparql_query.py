@@ -15,10 +15,25 @@ LEARNING OBJECTIVES:
 3. How to process query results
 """
 
+import functools
+import re
+import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from prometheus_client import Histogram
 import json
-from typing import List, Dict, Optional
-from SPARQLWrapper import SPARQLWrapper, JSON
+from typing import Callable, List, Dict
+
+# orjson decodes the (bytes) result documents several times faster than
+# the stdlib; fall back to json.loads if it isn't installed.
+# Always parse response.content: response.json() and response.text first
+# decode the whole body to str (guessing the charset if needed).
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
 
 
 # ========================================
@@ -31,15 +46,147 @@ FUSEKI_ENDPOINT = "http://localhost:3030/healthcare/sparql"
 # Namespace prefix for our healthcare ontology
 HEALTHCARE_PREFIX = "http://example.org/healthcare#"
 
+# One shared HTTP session: keeps TCP connections to Fuseki alive and
+# reuses them, instead of a new connection (and handshake) per query.
+# Failed connection attempts are retried twice with a short backoff, and
+# every request asks for SPARQL JSON results.
+_SESSION = requests.Session()
+_SESSION.mount("http://", HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=20,
+    max_retries=Retry(total=2, backoff_factor=0.2)
+))
+_SESSION.headers.update({'Accept': 'application/sparql-results+json'})
+
+
+# Known namespaces -> short form used in results. Our own namespace maps
+# to the bare local name ("...healthcare#Ibuprofen" -> "Ibuprofen").
+# Longest prefix first, so a more specific namespace wins.
+_PREFIX_TABLE = sorted([
+    (HEALTHCARE_PREFIX, ""),
+    ("http://www.w3.org/2000/01/rdf-schema#", "rdfs:"),
+    ("http://www.w3.org/1999/02/22-rdf-syntax-ns#", "rdf:"),
+    ("http://www.w3.org/2002/07/owl#", "owl:"),
+    ("http://www.w3.org/2001/XMLSchema#", "xsd:"),
+], key=lambda entry: len(entry[0]), reverse=True)
+
+
+def close_session() -> None:
+    """Close the pooled connections to Fuseki (call on application shutdown)."""
+    _SESSION.close()
+
+
+# ========================================
+# QUERY TEMPLATES
+# ========================================
+
+# The query text is built once at import. A call only substitutes the
+# entity's IRI local name: query = _Q_... % {'name': name}
+
+_SPARQL_PREFIXES = (
+    "PREFIX ex: <%s>\n"
+    "PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>\n" % HEALTHCARE_PREFIX
+)
+
+# "Find drugs that treat [disease] and tell me their mechanism".
+# Triple patterns are ordered by selectivity: the pattern with the fixed
+# disease binds ?drug first, joins follow through bound variables, and
+# the rdfs:label lookups come last.
+_Q_DRUGS_FOR_DISEASE = _SPARQL_PREFIXES + """
+SELECT ?drug ?drugLabel ?mechanism ?mechanismLabel ?dosage
+WHERE {
+    ?drug ex:treats ex:%(name)s .
+    ?drug ex:hasMechanism ?mechanism .
+    ?drug rdfs:label ?drugLabel .
+    ?mechanism rdfs:label ?mechanismLabel .
+    OPTIONAL { ?drug ex:hasDosage ?dosage }
+}
+"""
+
+_Q_DISEASE_SYMPTOMS = _SPARQL_PREFIXES + """
+SELECT ?symptom ?symptomLabel
+WHERE {
+    ex:%(name)s ex:hasSymptom ?symptom .
+    ?symptom rdfs:label ?symptomLabel .
+}
+"""
+
+# Single-valued properties of the fixed drug first, then the
+# multi-valued ex:treats, so the row count only grows at the end.
+# Only labels are projected, and DISTINCT makes Fuseki drop duplicate
+# rows before they are sent.
+_Q_DRUG_DETAILS = _SPARQL_PREFIXES + """
+SELECT DISTINCT ?diseaseLabel ?mechanismLabel ?dosage
+WHERE {
+    ex:%(name)s ex:hasMechanism ?mechanism .
+    ex:%(name)s ex:hasDosage ?dosage .
+    ex:%(name)s ex:treats ?disease .
+    ?disease rdfs:label ?diseaseLabel .
+    ?mechanism rdfs:label ?mechanismLabel .
+}
+"""
+
+# No parameters at all
+_Q_ALL_DRUGS = _SPARQL_PREFIXES + """
+SELECT DISTINCT ?drug ?drugLabel
+WHERE {
+    ?drug a ex:Drug .
+    ?drug rdfs:label ?drugLabel .
+}
+ORDER BY ?drugLabel
+"""
+
+# Names are pasted into the query as IRI local names (ex:<name>), so only
+# plain identifiers are accepted; anything else could inject SPARQL.
+_LOCAL_NAME_RE = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+
+
+def _is_local_name(name: str) -> bool:
+    """True if `name` is safe to use as an ex: IRI local name."""
+    return _LOCAL_NAME_RE.fullmatch(name) is not None
+
+
+# ========================================
+# METRICS
+# ========================================
+
+# Time spent per SPARQL round-trip (HTTP + parsing), by query function.
+# Exposed on the API's /metrics endpoint.
+SPARQL_QUERY_DURATION = Histogram(
+    'sparql_query_duration_seconds',
+    'Duration of SPARQL queries against Fuseki',
+    ['query_type']
+)
+
+
+def _observe(query_type: str) -> Callable:
+    """Decorator: record a query function's duration under `query_type`."""
+    def decorator(func: Callable) -> Callable:
+        histogram = SPARQL_QUERY_DURATION.labels(query_type=query_type)
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
 
 # ========================================
 # HELPER FUNCTIONS
 # ========================================
 
+@functools.lru_cache(maxsize=4096)
 def extract_local_name(uri: str) -> str:
     """
     Extract the local name from a full URI.
     
+    The same URIs (drugs, diseases, mechanisms) repeat across result rows,
+    so results are memoized.
+    
     Example:
         Input: "http://example.org/healthcare#Ibuprofen"
         Output: "Ibuprofen"
@@ -48,13 +195,18 @@ def extract_local_name(uri: str) -> str:
         uri: Full URI string
     
     Returns:
-        Local name (last part after # or /)
+        Local name, prefixed with its short form for known namespaces
+        (e.g. "rdfs:label"); otherwise the last part after # or /
     """
-    if '#' in uri:
-        return uri.split('#')[-1]
-    elif '/' in uri:
-        return uri.split('/')[-1]
-    return uri
+    # Known namespaces (almost every URI is in our own): str.startswith
+    for prefix, short in _PREFIX_TABLE:
+        if uri.startswith(prefix):
+            return short + uri[len(prefix):]
+    # Unknown namespace: rpartition finds the last separator without building a list
+    _, sep, local_name = uri.rpartition('#')
+    if sep:
+        return local_name
+    return uri.rpartition('/')[2]
 
 
 def format_query_results(results: Dict) -> List[Dict[str, str]]:
@@ -71,26 +223,24 @@ def format_query_results(results: Dict) -> List[Dict[str, str]]:
         Input: Complex JSON with URIs
         Output: [{"drug": "Ibuprofen", "mechanism": "COX_Inhibitor"}]
     """
-    formatted = []
-    
-    if 'results' in results and 'bindings' in results['results']:
-        for binding in results['results']['bindings']:
-            row = {}
-            for key, value in binding.items():
-                # Extract just the value, removing URI prefixes
-                if value['type'] == 'uri':
-                    row[key] = extract_local_name(value['value'])
-                else:
-                    row[key] = value['value']
-            formatted.append(row)
-    
-    return formatted
+    extract = extract_local_name  # local name: avoids a global lookup per cell
+    bindings = results.get('results', {}).get('bindings', ())
+    
+    # Extract just the value of each cell, removing URI prefixes
+    return [
+        {
+            key: extract(value['value']) if value['type'] == 'uri' else value['value']
+            for key, value in binding.items()
+        }
+        for binding in bindings
+    ]
 
 
 # ========================================
 # QUERY FUNCTIONS
 # ========================================
 
+@_observe("drugs_for_disease")
 def query_drugs_for_disease(disease_name: str) -> List[Dict[str, str]]:
     """
     Find all drugs that treat a specific disease.
@@ -109,42 +259,35 @@ def query_drugs_for_disease(disease_name: str) -> List[Dict[str, str]]:
         [{"drug": "Ibuprofen", "mechanism": "COX_Inhibitor"}]
     """
     
-    # SPARQL Query Construction
-    # This query says: "Find drugs that treat [disease] and tell me their mechanism"
-    query = f"""
-    PREFIX ex: <{HEALTHCARE_PREFIX}>
-    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+    if not _is_local_name(disease_name):
+        print(f"Invalid disease name: {disease_name!r}")
+        return []
     
-    SELECT ?drug ?drugLabel ?mechanism ?mechanismLabel ?dosage
-    WHERE {{
-        ?drug ex:treats ex:{disease_name} .
-        ?drug rdfs:label ?drugLabel .
-        ?drug ex:hasMechanism ?mechanism .
-        ?mechanism rdfs:label ?mechanismLabel .
-        OPTIONAL {{ ?drug ex:hasDosage ?dosage }}
-    }}
-    """
+    # SPARQL Query Construction (see _Q_DRUGS_FOR_DISEASE)
+    # This query says: "Find drugs that treat [disease] and tell me their mechanism"
+    query = _Q_DRUGS_FOR_DISEASE % {'name': disease_name}
     
     try:
         # Send query to Fuseki
-        response = requests.post(
+        response = _SESSION.post(
             FUSEKI_ENDPOINT,
-            data={'query': query},
-            headers={'Accept': 'application/sparql-results+json'}
+            data={'query': query}
         )
         
         # Check if request was successful
         response.raise_for_status()
         
-        # Parse and format results
-        results = response.json()
+        # Parse and format results straight from the raw bytes
+        results = _loads(response.content)
         return format_query_results(results)
     
-    except requests.exceptions.RequestException as e:
+    # ValueError covers a malformed JSON body (JSONDecodeError)
+    except (requests.exceptions.RequestException, ValueError) as e:
         print(f"Error querying SPARQL endpoint: {e}")
         return []
 
 
+@_observe("disease_symptoms")
 def query_disease_symptoms(disease_name: str) -> List[Dict[str, str]]:
     """
     Find all symptoms associated with a disease.
@@ -156,32 +299,27 @@ def query_disease_symptoms(disease_name: str) -> List[Dict[str, str]]:
         List of symptoms
     """
     
-    query = f"""
-    PREFIX ex: <{HEALTHCARE_PREFIX}>
-    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+    if not _is_local_name(disease_name):
+        print(f"Invalid disease name: {disease_name!r}")
+        return []
     
-    SELECT ?symptom ?symptomLabel
-    WHERE {{
-        ex:{disease_name} ex:hasSymptom ?symptom .
-        ?symptom rdfs:label ?symptomLabel .
-    }}
-    """
+    query = _Q_DISEASE_SYMPTOMS % {'name': disease_name}
     
     try:
-        response = requests.post(
+        response = _SESSION.post(
             FUSEKI_ENDPOINT,
-            data={'query': query},
-            headers={'Accept': 'application/sparql-results+json'}
+            data={'query': query}
         )
         response.raise_for_status()
-        results = response.json()
+        results = _loads(response.content)
         return format_query_results(results)
     
-    except requests.exceptions.RequestException as e:
+    except (requests.exceptions.RequestException, ValueError) as e:
         print(f"Error querying symptoms: {e}")
         return []
 
 
+@_observe("drug_details")
 def query_drug_details(drug_name: str) -> Dict[str, any]:
     """
     Get comprehensive information about a specific drug.
@@ -195,82 +333,257 @@ def query_drug_details(drug_name: str) -> Dict[str, any]:
         Dictionary with all drug information
     """
     
-    query = f"""
-    PREFIX ex: <{HEALTHCARE_PREFIX}>
-    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+    if not _is_local_name(drug_name):
+        print(f"Invalid drug name: {drug_name!r}")
+        return {}
     
-    SELECT ?disease ?diseaseLabel ?mechanism ?mechanismLabel ?dosage
-    WHERE {{
-        ex:{drug_name} ex:treats ?disease .
-        ex:{drug_name} ex:hasMechanism ?mechanism .
-        ex:{drug_name} ex:hasDosage ?dosage .
-        ?disease rdfs:label ?diseaseLabel .
-        ?mechanism rdfs:label ?mechanismLabel .
-    }}
-    """
+    query = _Q_DRUG_DETAILS % {'name': drug_name}
     
     try:
-        response = requests.post(
+        response = _SESSION.post(
             FUSEKI_ENDPOINT,
-            data={'query': query},
-            headers={'Accept': 'application/sparql-results+json'}
+            data={'query': query}
         )
         response.raise_for_status()
-        results = response.json()
+        results = _loads(response.content)
         formatted = format_query_results(results)
         
         if formatted:
             # Combine results into a single drug profile
+            treats = {r['diseaseLabel'] for r in formatted}
             drug_info = {
                 'name': drug_name,
-                'treats': list(set([r['diseaseLabel'] for r in formatted])),
-                'mechanism': formatted[0]['mechanismLabel'] if formatted else None,
+                'treats': list(treats),
+                'mechanism': formatted[0]['mechanismLabel'],
                 'dosage': formatted[0].get('dosage', 'Not specified')
             }
             return drug_info
         
         return {}
     
-    except requests.exceptions.RequestException as e:
+    except (requests.exceptions.RequestException, ValueError) as e:
         print(f"Error querying drug details: {e}")
         return {}
 
 
-def query_all_drugs() -> List[Dict[str, str]]:
+@_observe("drug_details_batch")
+def query_drug_details_batch(drug_names: List[str]) -> Dict[str, Dict[str, any]]:
     """
-    Get a list of all drugs in the ontology.
+    Get drug profiles for several drugs in ONE SPARQL query.
+    
+    A VALUES clause binds all the drugs at once, so the triple store
+    answers them in a single round-trip; GROUP BY folds the rows of
+    each drug into one result.
+    
+    Args:
+        drug_names: Names of the drugs (e.g., ["Ibuprofen", "Aspirin"])
     
     Returns:
-        List of all drugs with basic info
+        Dictionary mapping each found drug name to the same profile
+        shape as query_drug_details(). Unknown drugs are left out.
     """
     
+    invalid = [name for name in drug_names if not _is_local_name(name)]
+    if invalid:
+        print(f"Invalid drug name(s): {invalid}")
+        return {}
+    
+    values = ' '.join(f'ex:{name}' for name in drug_names)
     query = f"""
     PREFIX ex: <{HEALTHCARE_PREFIX}>
     PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
     
-    SELECT DISTINCT ?drug ?drugLabel
+    SELECT ?drug
+           (GROUP_CONCAT(DISTINCT ?diseaseLabel; separator="|") AS ?treats)
+           (SAMPLE(?mechanismLabel) AS ?mechanism)
+           (SAMPLE(?dosage) AS ?dosageValue)
     WHERE {{
-        ?drug a ex:Drug .
-        ?drug rdfs:label ?drugLabel .
+        VALUES ?drug {{ {values} }}
+        ?drug ex:hasMechanism ?mechanismNode .
+        ?drug ex:hasDosage ?dosage .
+        ?drug ex:treats ?disease .
+        ?disease rdfs:label ?diseaseLabel .
+        ?mechanismNode rdfs:label ?mechanismLabel .
     }}
-    ORDER BY ?drugLabel
+    GROUP BY ?drug
     """
     
     try:
-        response = requests.post(
+        response = _SESSION.post(
             FUSEKI_ENDPOINT,
-            data={'query': query},
-            headers={'Accept': 'application/sparql-results+json'}
+            data={'query': query}
         )
         response.raise_for_status()
-        results = response.json()
+        results = _loads(response.content)
+        
+        return {
+            row['drug']: {
+                'name': row['drug'],
+                'treats': row['treats'].split('|') if row.get('treats') else [],
+                'mechanism': row.get('mechanism'),
+                'dosage': row.get('dosageValue', 'Not specified')
+            }
+            for row in format_query_results(results)
+        }
+    
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"Error querying drug details: {e}")
+        return {}
+
+
+@_observe("all_drugs")
+def query_all_drugs() -> List[Dict[str, str]]:
+    """
+    Get a list of all drugs in the ontology.
+    
+    Returns:
+        List of all drugs with basic info
+    """
+    
+    query = _Q_ALL_DRUGS
+    
+    try:
+        response = _SESSION.post(
+            FUSEKI_ENDPOINT,
+            data={'query': query}
+        )
+        response.raise_for_status()
+        results = _loads(response.content)
         return format_query_results(results)
     
-    except requests.exceptions.RequestException as e:
+    except (requests.exceptions.RequestException, ValueError) as e:
         print(f"Error querying all drugs: {e}")
         return []
 
 
+@_observe("batch")
+def batch_query(disease_names: List[str], drug_names: List[str],
+                include_all_drugs: bool = False) -> Dict[str, any]:
+    """
+    Answer several lookups in ONE SPARQL query (one HTTP round-trip).
+    
+    Each lookup is a UNION branch tagged with a ?kind literal, and a
+    VALUES clause binds all the diseases (or drugs) of that branch at
+    once. The rows are then split by ?kind into the same shapes the
+    individual query functions return.
+    
+    Args:
+        disease_names: Diseases to fetch treatments and symptoms for
+        drug_names: Drugs to fetch detail profiles for
+        include_all_drugs: Also list every drug in the ontology
+    
+    Returns:
+        Dictionary with:
+        - 'drugs_for_disease': {disease: rows like query_drugs_for_disease()}
+        - 'symptoms': {disease: rows like query_disease_symptoms()}
+        - 'drug_details': {drug: profile like query_drug_details()}
+        - 'all_drugs': rows like query_all_drugs() (empty unless requested)
+    """
+    
+    batch = {
+        'drugs_for_disease': {name: [] for name in disease_names},
+        'symptoms': {name: [] for name in disease_names},
+        'drug_details': {},
+        'all_drugs': []
+    }
+    
+    invalid = [n for n in list(disease_names) + list(drug_names) if not _is_local_name(n)]
+    if invalid:
+        print(f"Invalid name(s) in batch query: {invalid}")
+        return batch
+    
+    branches = []
+    if disease_names:
+        diseases = ' '.join(f'ex:{name}' for name in disease_names)
+        branches.append(f"""{{
+            VALUES ?entity {{ {diseases} }}
+            BIND("treatment" AS ?kind)
+            ?drug ex:treats ?entity .
+            ?drug ex:hasMechanism ?mechanism .
+            ?drug rdfs:label ?drugLabel .
+            ?mechanism rdfs:label ?mechanismLabel .
+            OPTIONAL {{ ?drug ex:hasDosage ?dosage }}
+        }}""")
+        branches.append(f"""{{
+            VALUES ?entity {{ {diseases} }}
+            BIND("symptom" AS ?kind)
+            ?entity ex:hasSymptom ?symptom .
+            ?symptom rdfs:label ?symptomLabel .
+        }}""")
+    if drug_names:
+        drugs = ' '.join(f'ex:{name}' for name in drug_names)
+        branches.append(f"""{{
+            VALUES ?entity {{ {drugs} }}
+            BIND("details" AS ?kind)
+            ?entity ex:hasMechanism ?mechanism .
+            ?entity ex:hasDosage ?dosage .
+            ?entity ex:treats ?disease .
+            ?disease rdfs:label ?diseaseLabel .
+            ?mechanism rdfs:label ?mechanismLabel .
+        }}""")
+    if include_all_drugs:
+        branches.append("""{
+            BIND("all_drugs" AS ?kind)
+            ?drug a ex:Drug .
+            ?drug rdfs:label ?drugLabel .
+        }""")
+    
+    if not branches:
+        return batch
+    
+    union = '\n        UNION\n        '.join(branches)
+    query = f"""
+    PREFIX ex: <{HEALTHCARE_PREFIX}>
+    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+    
+    SELECT ?kind ?entity ?drug ?drugLabel ?mechanism ?mechanismLabel ?dosage
+           ?symptom ?symptomLabel ?disease ?diseaseLabel
+    WHERE {{
+        {union}
+    }}
+    """
+    
+    try:
+        response = _SESSION.post(
+            FUSEKI_ENDPOINT,
+            data={'query': query}
+        )
+        response.raise_for_status()
+        results = _loads(response.content)
+    
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"Error running batch query: {e}")
+        return batch
+    
+    details_rows: Dict[str, List[Dict[str, str]]] = {}
+    all_drugs = {}
+    
+    for row in format_query_results(results):
+        kind = row.pop('kind')
+        entity = row.pop('entity', None)
+        
+        if kind == 'treatment':
+            batch['drugs_for_disease'][entity].append(row)
+        elif kind == 'symptom':
+            batch['symptoms'][entity].append(row)
+        elif kind == 'details':
+            details_rows.setdefault(entity, []).append(row)
+        elif kind == 'all_drugs':
+            all_drugs[row['drug']] = row  # DISTINCT
+    
+    # Combine each drug's rows into a single profile (as query_drug_details)
+    for name, rows in details_rows.items():
+        batch['drug_details'][name] = {
+            'name': name,
+            'treats': list(dict.fromkeys(r['diseaseLabel'] for r in rows)),
+            'mechanism': rows[0]['mechanismLabel'],
+            'dosage': rows[0].get('dosage', 'Not specified')
+        }
+    
+    batch['all_drugs'] = sorted(all_drugs.values(), key=lambda d: d['drugLabel'])
+    return batch
+
+
 def test_connection() -> bool:
     """
     Test if we can connect to the Fuseki endpoint.
@@ -285,10 +598,9 @@ def test_connection() -> bool:
     """
     
     try:
-        response = requests.post(
+        response = _SESSION.post(
             FUSEKI_ENDPOINT,
             data={'query': query},
-            headers={'Accept': 'application/sparql-results+json'},
             timeout=5
         )
         response.raise_for_status()
@@ -324,9 +636,13 @@ if __name__ == "__main__":
         print("❌ Connection failed. Please check Fuseki setup.")
         exit(1)
     
+    # Tests 2-5 need four lookups; fetch them all in ONE round-trip
+    batch = batch_query(["Arthritis", "Diabetes"], ["Ibuprofen"],
+                        include_all_drugs=True)
+    
     # Test 2: Query drugs for Arthritis
     print("\n[Test 2] Querying drugs for Arthritis...")
-    drugs = query_drugs_for_disease("Arthritis")
+    drugs = batch['drugs_for_disease']["Arthritis"]
     if drugs:
         print(f"✅ Found {len(drugs)} drug(s):")
         for drug in drugs:
@@ -336,7 +652,7 @@ if __name__ == "__main__":
     
     # Test 3: Query disease symptoms
     print("\n[Test 3] Querying symptoms of Diabetes...")
-    symptoms = query_disease_symptoms("Diabetes")
+    symptoms = batch['symptoms']["Diabetes"]
     if symptoms:
         print(f"✅ Found {len(symptoms)} symptom(s):")
         for symptom in symptoms:
@@ -346,7 +662,7 @@ if __name__ == "__main__":
     
     # Test 4: Get drug details
     print("\n[Test 4] Getting details for Ibuprofen...")
-    details = query_drug_details("Ibuprofen")
+    details = batch['drug_details'].get("Ibuprofen")
     if details:
         print("✅ Drug details:")
         print(f"   Name: {details.get('name')}")
@@ -358,7 +674,7 @@ if __name__ == "__main__":
     
     # Test 5: List all drugs
     print("\n[Test 5] Listing all drugs in ontology...")
-    all_drugs = query_all_drugs()
+    all_drugs = batch['all_drugs']
     if all_drugs:
         print(f"✅ Found {len(all_drugs)} drug(s):")
         for drug in all_drugs:
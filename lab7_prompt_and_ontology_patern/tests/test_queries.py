@@ -0,0 +1,249 @@
+"""
+Tests for the SPARQL query functions and the retrieval cache.
+
+No Fuseki needed: the HTTP session's post() is replaced by a fake that
+records each query and returns canned SPARQL JSON results.
+
+Run from the lab folder:
+    python -m pytest tests/
+"""
+
+import os
+import sys
+
+import orjson
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import prompt_generator, sparql_query
+from src.prompt_generator import TTLCache
+
+
+# ========================================
+# FIXTURES
+# ========================================
+
+class FakeResponse:
+    """Just enough of requests.Response for the query functions."""
+
+    def __init__(self, bindings):
+        self.content = orjson.dumps({'results': {'bindings': bindings}})
+
+    def raise_for_status(self):
+        pass
+
+
+def uri(local_name):
+    return {'type': 'uri', 'value': sparql_query.HEALTHCARE_PREFIX + local_name}
+
+
+def literal(text):
+    return {'type': 'literal', 'value': text}
+
+
+ARTHRITIS_DRUGS = [{
+    'drug': uri('Ibuprofen'),
+    'drugLabel': literal('Ibuprofen'),
+    'mechanism': uri('COX_Inhibitor'),
+    'mechanismLabel': literal('COX Inhibitor'),
+}]
+
+IBUPROFEN_DETAILS = [{
+    'diseaseLabel': literal('Arthritis'),
+    'mechanismLabel': literal('COX Inhibitor'),
+    'dosage': literal('200-400mg'),
+}]
+
+
+class Clock:
+    """Stand-in for time.monotonic that only moves when told to."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(prompt_generator.time, 'monotonic', clock)
+    return clock
+
+
+@pytest.fixture
+def sparql(monkeypatch, tmp_path):
+    """
+    Fake Fuseki: returns `sparql.bindings` and records every query sent.
+    Also starts each test with an empty retrieval cache.
+    """
+    class FakeEndpoint:
+        bindings = []
+        queries = []
+
+        def post(self, url, data):
+            self.queries.append(data['query'])
+            return FakeResponse(self.bindings)
+
+    endpoint = FakeEndpoint()
+    endpoint.queries = []
+    monkeypatch.setattr(sparql_query._SESSION, 'post', endpoint.post)
+    # Keep the shared cache generation file out of the real temp dir
+    monkeypatch.setattr(prompt_generator, 'CACHE_GENERATION_FILE',
+                        str(tmp_path / 'cache.generation'))
+    prompt_generator.clear_cache()
+    yield endpoint
+    prompt_generator.clear_cache()
+
+
+# ========================================
+# TTLCache
+# ========================================
+
+def test_entry_expires_after_ttl(clock):
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set(('k',), 'value')
+
+    clock.now += 59
+    assert cache.get(('k',)) == (True, 'value')
+
+    clock.now += 2
+    assert cache.get(('k',)) == (False, None)
+    assert cache.stats()['size'] == 0
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set(('a',), 1)
+    cache.set(('b',), 2)
+    cache.get(('a',))           # 'a' is now the most recently used
+    cache.set(('c',), 3)        # over maxsize: 'b' goes
+
+    assert cache.get(('b',)) == (False, None)
+    assert cache.get(('a',)) == (True, 1)
+    assert cache.get(('c',)) == (True, 3)
+
+
+def test_ttl_override_per_entry(clock):
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set(('short',), [], ttl=30)
+
+    clock.now += 31
+    assert cache.get(('short',)) == (False, None)
+
+
+def test_stats_count_hits_misses_and_negative_hits(clock):
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set(('full',), [1])
+    cache.set(('empty',), [])
+    cache.get(('full',))
+    cache.get(('empty',))
+    cache.get(('missing',))
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['negative_hits']) == (2, 1, 1)
+    assert stats['hit_ratio'] == pytest.approx(2 / 3)
+
+
+# ========================================
+# CACHED QUERY FUNCTIONS
+# ========================================
+
+def test_repeated_query_is_served_from_cache(sparql, clock):
+    sparql.bindings = ARTHRITIS_DRUGS
+
+    first = prompt_generator.query_drugs_for_disease('Arthritis')
+    second = prompt_generator.query_drugs_for_disease('Arthritis')
+
+    assert first == second == [{
+        'drug': 'Ibuprofen',
+        'drugLabel': 'Ibuprofen',
+        'mechanism': 'COX_Inhibitor',
+        'mechanismLabel': 'COX Inhibitor',
+    }]
+    assert len(sparql.queries) == 1
+
+
+def test_cached_result_expires_after_ttl(sparql, clock):
+    sparql.bindings = ARTHRITIS_DRUGS
+    prompt_generator.query_drugs_for_disease('Arthritis')
+
+    clock.now += prompt_generator.CACHE_TTL_SECONDS + 1
+    prompt_generator.query_drugs_for_disease('Arthritis')
+
+    assert len(sparql.queries) == 2
+
+
+def test_empty_result_uses_negative_ttl(sparql, clock):
+    sparql.bindings = []
+    assert prompt_generator.query_drugs_for_disease('Flu') == []
+
+    # Still cached within the (shorter) negative TTL ...
+    clock.now += prompt_generator.NEGATIVE_CACHE_TTL_SECONDS - 1
+    prompt_generator.query_drugs_for_disease('Flu')
+    assert len(sparql.queries) == 1
+
+    # ... and asked again once it is over, well before the normal TTL
+    clock.now += 2
+    prompt_generator.query_drugs_for_disease('Flu')
+    assert len(sparql.queries) == 2
+    assert prompt_generator.get_cache_stats()['negative_hits'] == 1
+
+
+def test_names_are_stripped_before_lookup(sparql, clock):
+    sparql.bindings = IBUPROFEN_DETAILS
+    details = prompt_generator.query_drug_details('Ibuprofen')
+
+    assert prompt_generator.query_drug_details(' Ibuprofen') == details
+    assert prompt_generator.query_drug_details('Ibuprofen\n') == details
+    assert len(sparql.queries) == 1
+
+
+def test_callers_get_their_own_copy(sparql, clock):
+    sparql.bindings = ARTHRITIS_DRUGS
+    result = prompt_generator.query_drugs_for_disease('Arthritis')
+    result[0]['drugLabel'] = 'changed'
+    result.clear()
+
+    assert prompt_generator.query_drugs_for_disease('Arthritis')[0]['drugLabel'] == 'Ibuprofen'
+
+
+# ========================================
+# QUERY BUILDERS
+# ========================================
+
+def test_disease_name_becomes_iri_local_name(sparql):
+    sparql_query.query_drugs_for_disease('Arthritis')
+
+    assert 'ex:treats ex:Arthritis .' in sparql.queries[0]
+
+
+def test_drug_details_combines_rows(sparql):
+    sparql.bindings = IBUPROFEN_DETAILS
+
+    assert sparql_query.query_drug_details('Ibuprofen') == {
+        'name': 'Ibuprofen',
+        'treats': ['Arthritis'],
+        'mechanism': 'COX Inhibitor',
+        'dosage': '200-400mg',
+    }
+    assert 'ex:Ibuprofen ex:hasMechanism ?mechanism' in sparql.queries[0]
+
+
+@pytest.mark.parametrize('name', ['Arthritis}', 'a b', '', '1abc', 'x:y'])
+def test_unsafe_names_are_rejected_without_a_query(sparql, name):
+    assert sparql_query.query_drugs_for_disease(name) == []
+    assert sparql_query.query_drug_details(name) == {}
+    assert sparql.queries == []
+
+
+def test_uri_and_literal_cells_are_formatted(sparql):
+    rows = sparql_query.format_query_results({'results': {'bindings': [{
+        'drug': uri('Ibuprofen'),
+        'type': {'type': 'uri', 'value': 'http://www.w3.org/2002/07/owl#Class'},
+        'label': literal('Ibuprofen'),
+    }]}})
+
+    assert rows == [{'drug': 'Ibuprofen', 'type': 'owl:Class', 'label': 'Ibuprofen'}]
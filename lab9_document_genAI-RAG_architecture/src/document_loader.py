@@ -12,10 +12,19 @@ Why split documents?
 - More precise retrieval
 """
 
+from bisect import bisect_right
 from pathlib import Path
-from typing import List, Dict
+from typing import Dict, Iterable, Iterator, List
+import logging
 import re
 
+logger = logging.getLogger(__name__)
+
+
+# Sentence boundaries where a chunk may end: '. ' or a newline.
+# All of them are found in one regex scan per document.
+_SENTENCE_BOUNDARY = re.compile(r'\. |\n')
+
 
 class Document:
     """
@@ -50,6 +59,37 @@ class DocumentLoader:
         if not self.data_dir.exists():
             raise ValueError(f"Data directory not found: {self.data_dir}")
     
+    def iter_documents(self) -> Iterator[Document]:
+        """
+        Lazily load text documents from the data directory, one at a time
+        
+        Only the current document is held in memory, so a corpus larger
+        than RAM can be streamed through split_documents().
+        
+        Yields:
+            Document objects (files that can't be read are skipped)
+        """
+        for file_path in self.data_dir.glob("*.txt"):
+            try:
+                # Read the file (one call: open, read, close)
+                content = file_path.read_text(encoding='utf-8')
+            except Exception as e:
+                logger.warning(f"  ✗ Error loading {file_path.name}: {e}")
+                continue
+            
+            # Create metadata (size from the text already in memory,
+            # no extra stat() call)
+            metadata = {
+                'source': file_path.name,
+                'path': str(file_path),
+                'size': len(content)
+            }
+            
+            logger.info(f"  ✓ Loaded: {file_path.name} ({len(content)} characters)")
+            
+            # Create document object
+            yield Document(content=content, metadata=metadata)
+    
     def load_documents(self) -> List[Document]:
         """
         Load all text documents from the data directory
@@ -57,43 +97,18 @@ class DocumentLoader:
         Returns:
             List of Document objects
         """
-        documents = []
+        logger.info(f"📚 Loading documents from {self.data_dir}...")
         
-        # Find all .txt files in the data directory
-        txt_files = list(self.data_dir.glob("*.txt"))
+        documents = list(self.iter_documents())
         
-        if not txt_files:
-            print(f"⚠️  No .txt files found in {self.data_dir}")
+        if not documents:
+            logger.warning(f"⚠️  No .txt files found in {self.data_dir}")
             return documents
         
-        print(f"📚 Found {len(txt_files)} documents to load...")
-        
-        for file_path in txt_files:
-            try:
-                # Read the file
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                # Create metadata
-                metadata = {
-                    'source': file_path.name,
-                    'path': str(file_path),
-                    'size': len(content)
-                }
-                
-                # Create document object
-                doc = Document(content=content, metadata=metadata)
-                documents.append(doc)
-                
-                print(f"  ✓ Loaded: {file_path.name} ({len(content)} characters)")
-                
-            except Exception as e:
-                print(f"  ✗ Error loading {file_path.name}: {e}")
-        
-        print(f"✅ Successfully loaded {len(documents)} documents\n")
+        logger.info(f"✅ Successfully loaded {len(documents)} documents\n")
         return documents
     
-    def split_documents(self, documents: List[Document], 
+    def split_documents(self, documents: Iterable[Document], 
                        chunk_size: int = 500, 
                        chunk_overlap: int = 50) -> List[Document]:
         """
@@ -102,23 +117,52 @@ class DocumentLoader:
         Why? Large documents need to be broken into focused pieces.
         
         Args:
-            documents: List of documents to split
+            documents: Documents to split (a list, or iter_documents())
             chunk_size: Maximum size of each chunk (in characters)
             chunk_overlap: Overlap between chunks (prevents cutting sentences)
         
         Returns:
             List of document chunks
         """
+        logger.info(f"✂️  Splitting documents into chunks...")
+        logger.info(f"   Chunk size: {chunk_size} characters")
+        logger.info(f"   Overlap: {chunk_overlap} characters\n")
+        
         chunks = []
+        num_documents = 0
+        
+        for doc in documents:
+            num_documents += 1
+            chunks.extend(self.iter_chunks([doc], chunk_size, chunk_overlap))
+        
+        logger.info(f"\n✅ Created {len(chunks)} total chunks from {num_documents} documents\n")
+        return chunks
+    
+    def iter_chunks(self, documents: Iterable[Document],
+                    chunk_size: int = 500,
+                    chunk_overlap: int = 50) -> Iterator[Document]:
+        """
+        Lazily split documents into chunks (see split_documents)
+        
+        Each document is consumed and chunked before the next one is read.
         
-        print(f"✂️  Splitting documents into chunks...")
-        print(f"   Chunk size: {chunk_size} characters")
-        print(f"   Overlap: {chunk_overlap} characters\n")
+        Args:
+            documents: Documents to split (a list, or iter_documents())
+            chunk_size: Maximum size of each chunk (in characters)
+            chunk_overlap: Overlap between chunks (prevents cutting sentences)
         
+        Yields:
+            Document chunks
+        """
         for doc in documents:
             # Split the document into chunks
             text = doc.content
-            doc_chunks = []
+            
+            # Locate every sentence boundary up front (one C-level scan):
+            # where each boundary starts, and where its match ends
+            matches = list(_SENTENCE_BOUNDARY.finditer(text))
+            boundary_starts = [m.start() for m in matches]
+            boundary_ends = [m.end() for m in matches]
             
             # Start position in the document
             start = 0
@@ -128,38 +172,31 @@ class DocumentLoader:
                 # End position for this chunk
                 end = start + chunk_size
                 
+                # Try to break at a sentence boundary ('. ' or '\n')
+                if end < len(text):
+                    # Last boundary that lies completely inside the chunk
+                    i = bisect_right(boundary_ends, end) - 1
+                    if i >= 0:
+                        break_point = boundary_starts[i] - start
+                        if break_point > chunk_size * 0.5:  # Only break if it's not too early
+                            end = start + break_point + 1
+                
                 # Get the chunk
                 chunk_text = text[start:end]
                 
-                # Try to break at a sentence boundary (look for '. ' or '\n')
-                if end < len(text):
-                    # Look for last period or newline in the chunk
-                    last_period = chunk_text.rfind('. ')
-                    last_newline = chunk_text.rfind('\n')
-                    break_point = max(last_period, last_newline)
-                    
-                    if break_point > chunk_size * 0.5:  # Only break if it's not too early
-                        chunk_text = chunk_text[:break_point + 1]
-                        end = start + break_point + 1
-                
                 # Create metadata for this chunk
                 chunk_metadata = doc.metadata.copy()
                 chunk_metadata['chunk'] = chunk_num
                 chunk_metadata['chunk_size'] = len(chunk_text)
                 
                 # Create the chunk document
-                chunk_doc = Document(content=chunk_text.strip(), metadata=chunk_metadata)
-                doc_chunks.append(chunk_doc)
+                yield Document(content=chunk_text.strip(), metadata=chunk_metadata)
                 
                 # Move to next chunk with overlap
                 start = end - chunk_overlap
                 chunk_num += 1
             
-            chunks.extend(doc_chunks)
-            print(f"  {doc.metadata['source']}: {len(doc_chunks)} chunks")
-        
-        print(f"\n✅ Created {len(chunks)} total chunks from {len(documents)} documents\n")
-        return chunks
+            logger.info(f"  {doc.metadata['source']}: {chunk_num} chunks")
 
 
 def clean_text(text: str) -> str:
@@ -176,6 +213,8 @@ def clean_text(text: str) -> str:
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    
     # Test the document loader
     from config import Config
     
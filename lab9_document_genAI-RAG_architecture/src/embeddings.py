@@ -17,9 +17,180 @@ Example:
 """
 
 from sentence_transformers import SentenceTransformer
-from typing import List
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+import hashlib
+import logging
+import math
+import sqlite3
 import numpy as np
 
+logger = logging.getLogger(__name__)
+
+
+class QuantizedEncoder:
+    """
+    int8-quantized ONNX version of a sentence-transformer
+    
+    Runs the transformer with ONNX Runtime, whose int8 matmuls use the
+    CPU's VNNI dot-product instructions (Intel Ice Lake+, AMD Zen 4):
+    roughly 2-4x faster than the float32 PyTorch model, with a tiny
+    accuracy loss that doesn't matter for ranking documents.
+    
+    Exposes the same encode() / get_sentence_embedding_dimension()
+    methods that EmbeddingModel uses on a SentenceTransformer.
+    Needs the optional packages `optimum[onnxruntime]` and `transformers`.
+    """
+    
+    def __init__(self, model_dir: Path, tokenizer_name: str, max_seq_length: int = 256):
+        """
+        Load a quantized model
+        
+        Args:
+            model_dir: Folder created by `optimum-cli onnxruntime quantize`
+            tokenizer_name: Model whose tokenizer to use (the original model)
+            max_seq_length: Longer inputs are truncated (256 for MiniLM)
+        """
+        from optimum.onnxruntime import ORTModelForFeatureExtraction
+        from transformers import AutoTokenizer
+        
+        model_dir = Path(model_dir)
+        file_name = "model_quantized.onnx"
+        if not (model_dir / file_name).exists():
+            file_name = "model.onnx"
+        
+        self.model = ORTModelForFeatureExtraction.from_pretrained(model_dir, file_name=file_name)
+        self.tokenizer = AutoTokenizer.from_pretrained(tokenizer_name)
+        self.max_seq_length = max_seq_length
+    
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.model.config.hidden_size
+    
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32,
+               show_progress_bar: bool = False, convert_to_numpy: bool = True,
+               normalize_embeddings: bool = False) -> np.ndarray:
+        """Embed text(s): transformer + mean pooling (+ optional L2 normalization)"""
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            inputs = self.tokenizer(
+                texts[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np"
+            )
+            hidden = self.model(**inputs).last_hidden_state
+            
+            # Mean pooling over the real (non-padding) tokens
+            mask = inputs["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            batches.append(pooled.astype(np.float32))
+        
+        embeddings = (np.concatenate(batches) if batches
+                      else np.zeros((0, self.get_sentence_embedding_dimension()), dtype=np.float32))
+        if normalize_embeddings:
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        
+        return embeddings[0] if single else embeddings
+
+
+class EmbeddingCache:
+    """
+    Persistent cache: text -> embedding, stored in a SQLite file
+    
+    Each text is looked up by sha256(model + text), so a rebuild only
+    embeds chunks that are new or changed, and a repeated question skips
+    the model completely. The most recently used vectors are also kept
+    in memory (LRU), so hot questions don't even touch the database.
+    """
+    
+    def __init__(self, db_path: Path, memory_size: int = 1024):
+        """
+        Open (or create) the cache
+        
+        Args:
+            db_path: SQLite file to store the embeddings in
+            memory_size: How many vectors to keep in the in-memory LRU
+        """
+        db_path = Path(db_path)
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        self.conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vec BLOB)")
+        self.conn.commit()
+        
+        self.memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self.memory_size = memory_size
+    
+    @staticmethod
+    def make_key(model_id: str, text: str) -> str:
+        """Cache key of one text for one model"""
+        return hashlib.sha256(f"{model_id}\0{text}".encode()).hexdigest()
+    
+    def _remember(self, key: str, vec: np.ndarray):
+        self.memory[key] = vec
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+    
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Look up several keys at once
+        
+        Args:
+            keys: Cache keys (see make_key)
+        
+        Returns:
+            Dictionary key -> float16 vector, only for the keys that were found
+        """
+        found = {}
+        missing = []
+        for key in keys:
+            vec = self.memory.get(key)
+            if vec is not None:
+                self.memory.move_to_end(key)
+                found[key] = vec
+            else:
+                missing.append(key)
+        
+        # SQLite limits the number of ? placeholders per statement
+        for start in range(0, len(missing), 500):
+            batch = missing[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT key, vec FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                batch
+            )
+            for key, blob in rows:
+                vec = np.frombuffer(blob, dtype=np.float16)
+                found[key] = vec
+                self._remember(key, vec)
+        
+        return found
+    
+    def put_many(self, items: Iterable[Tuple[str, np.ndarray]]):
+        """
+        Store several (key, vector) pairs (vectors are saved as float16)
+        
+        Args:
+            items: Iterable of (key, vector) pairs
+        """
+        rows = []
+        for key, vec in items:
+            vec = np.ascontiguousarray(vec, dtype=np.float16)
+            self._remember(key, vec)
+            rows.append((key, vec.tobytes()))
+        
+        self.conn.executemany("INSERT OR REPLACE INTO embeddings (key, vec) VALUES (?, ?)", rows)
+        self.conn.commit()
+    
+    def close(self):
+        """Close the database file"""
+        self.conn.close()
+
 
 class EmbeddingModel:
     """
@@ -28,29 +199,50 @@ class EmbeddingModel:
     This uses sentence-transformers, which runs locally (no API needed!)
     """
     
-    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2"):
+    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+                 quantized_model_dir: Optional[Path] = None):
         """
         Initialize the embedding model
         
         Args:
             model_name: Name of the sentence-transformer model
                        Default is a fast, lightweight model (384 dimensions)
+            quantized_model_dir: Optional folder with an int8 ONNX export of
+                       the same model. Used instead of the PyTorch model if
+                       it exists and optimum is installed.
         """
-        print(f"🔧 Loading embedding model: {model_name}")
-        print("   (This might take a moment on first run...)")
+        logger.info(f"🔧 Loading embedding model: {model_name}")
+        logger.info("   (This might take a moment on first run...)")
+        
+        self.model_name = model_name
+        self.backend = "sentence-transformers"
         
         try:
-            self.model = SentenceTransformer(model_name)
+            self.model = None
+            if quantized_model_dir is not None and Path(quantized_model_dir).exists():
+                try:
+                    self.model = QuantizedEncoder(quantized_model_dir, model_name)
+                    self.backend = "onnx-int8"
+                    logger.info(f"   ⚡ Using int8 quantized model from {quantized_model_dir}")
+                except ImportError:
+                    logger.warning("   ⚠️  optimum not installed - using the regular model")
+            
+            if self.model is None:
+                self.model = SentenceTransformer(model_name)
             self.dimension = self.model.get_sentence_embedding_dimension()
-            print(f"✅ Model loaded! Embedding dimension: {self.dimension}\n")
+            logger.info(f"✅ Model loaded! Embedding dimension: {self.dimension}\n")
         except Exception as e:
-            print(f"❌ Error loading model: {e}")
+            logger.error(f"❌ Error loading model: {e}")
             raise
     
     def embed_text(self, text: str) -> np.ndarray:
         """
         Convert a single text string to an embedding vector
         
+        Meant for one-off strings such as a user question. For a list of
+        texts, do NOT call this in a loop: use embed_text_many() or
+        embed_documents(), which encode whole batches at once.
+        
         Args:
             text: The text to embed
         
@@ -63,9 +255,37 @@ class EmbeddingModel:
             >>> print(vector.shape)
             (384,)
         """
-        embedding = self.model.encode(text, convert_to_numpy=True)
+        embedding = self.model.encode(
+            text,
+            convert_to_numpy=True,
+            normalize_embeddings=True  # unit length, same as documents
+        )
         return embedding
     
+    def embed_text_many(self, texts: List[str], batch_size: int = 64) -> np.ndarray:
+        """
+        Convert many texts to embeddings quietly, in large batches
+        
+        The transformer encodes a whole batch in one pass, which is far
+        faster than one text at a time. The default batch of 64 suits a
+        GPU; lower it if memory is tight.
+        
+        Args:
+            texts: List of text strings to embed
+            batch_size: Number of texts encoded per forward pass
+        
+        Returns:
+            float16 numpy array of shape (num_texts, dimension)
+        """
+        embeddings = self.model.encode(
+            texts,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+            batch_size=batch_size,
+            normalize_embeddings=True
+        )
+        return embeddings.astype(np.float16)
+    
     def embed_documents(self, texts: List[str], show_progress: bool = True) -> np.ndarray:
         """
         Convert multiple texts to embeddings (batch processing)
@@ -77,7 +297,8 @@ class EmbeddingModel:
             show_progress: Whether to show progress bar
         
         Returns:
-            numpy array of shape (num_texts, dimension)
+            numpy array of shape (num_texts, dimension), stored as float16
+            (half the memory; cosine similarity barely notices the precision)
         
         Example:
             >>> embedder = EmbeddingModel()
@@ -86,16 +307,62 @@ class EmbeddingModel:
             >>> print(vectors.shape)
             (3, 384)
         """
-        print(f"🔄 Creating embeddings for {len(texts)} documents...")
+        logger.info(f"🔄 Creating embeddings for {len(texts)} documents...")
         
         embeddings = self.model.encode(
             texts,
             convert_to_numpy=True,
             show_progress_bar=show_progress,
-            batch_size=32  # Process 32 documents at a time
+            batch_size=32,  # Process 32 documents at a time
+            normalize_embeddings=True  # Unit length: cosine = plain dot product
         )
         
-        print(f"✅ Created embeddings: shape {embeddings.shape}\n")
+        # Keep document vectors in half precision (2 bytes per number).
+        # Math on them upcasts to float32; FAISS converts when indexing.
+        embeddings = embeddings.astype(np.float16)
+        
+        logger.info(f"✅ Created embeddings: shape {embeddings.shape}\n")
+        return embeddings
+    
+    def embed_with_cache(self, texts: List[str], cache: EmbeddingCache,
+                         show_progress: bool = False) -> np.ndarray:
+        """
+        Embed texts, computing only the ones missing from the cache
+        
+        Args:
+            texts: List of text strings to embed
+            cache: EmbeddingCache to read from and fill
+            show_progress: Embed the misses with embed_documents()
+                          (progress bar) instead of quietly
+        
+        Returns:
+            float16 numpy array of shape (num_texts, dimension), in input order
+        """
+        model_id = f"{self.model_name}\0{self.backend}"
+        keys = [cache.make_key(model_id, text) for text in texts]
+        found = cache.get_many(keys)
+        
+        # Embed each missing text once, even if it appears several times
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        
+        if missing:
+            miss_texts = list(missing.values())
+            if show_progress:
+                new = self.embed_documents(miss_texts)
+            else:
+                new = self.embed_text_many(miss_texts)
+            cache.put_many(zip(missing.keys(), new))
+            found.update(zip(missing.keys(), new))
+        elif show_progress:
+            logger.info(f"♻️  All {len(texts)} embeddings found in cache\n")
+        
+        # Stitch cached + new vectors together in the original order
+        embeddings = np.empty((len(texts), self.dimension), dtype=np.float16)
+        for i, key in enumerate(keys):
+            embeddings[i] = found[key]
         return embeddings
     
     def compute_similarity(self, embedding1: np.ndarray, embedding2: np.ndarray) -> float:
@@ -114,14 +381,35 @@ class EmbeddingModel:
         Returns:
             Similarity score (0 to 1)
         """
-        # Normalize the vectors
-        norm1 = embedding1 / np.linalg.norm(embedding1)
-        norm2 = embedding2 / np.linalg.norm(embedding2)
+        # Upcast float16 storage (no copy if already float32)
+        a = embedding1.astype(np.float32, copy=False)
+        b = embedding2.astype(np.float32, copy=False)
+        
+        # cos = a.b / (|a| |b|) - three dot products, no normalized copies
+        return float(np.dot(a, b) / math.sqrt(np.dot(a, a) * np.dot(b, b)))
+    
+    def similarity_matrix(self, embeddings: np.ndarray) -> np.ndarray:
+        """
+        Compute the cosine similarity of every pair of embeddings at once
         
-        # Compute dot product (cosine similarity for normalized vectors)
-        similarity = np.dot(norm1, norm2)
+        Each vector is normalized once, then a single matrix product
+        (embeddings @ embeddings.T) gives all n x n dot products, instead
+        of calling compute_similarity() n * n times.
         
-        return float(similarity)
+        Args:
+            embeddings: numpy array of shape (num_texts, dimension)
+        
+        Returns:
+            numpy array of shape (num_texts, num_texts);
+            entry [i, j] is the similarity of text i and text j
+        """
+        # Upcast float16 storage to float32 for the math
+        emb32 = embeddings.astype(np.float32)
+        
+        # Row norms in one pass, then normalize in place (no extra arrays)
+        norms = np.sqrt(np.einsum('ij,ij->i', emb32, emb32))
+        emb32 /= norms[:, None]
+        return emb32 @ emb32.T
 
 
 def test_embeddings():
@@ -152,7 +440,8 @@ def test_embeddings():
     # Create embeddings
     embeddings = embedder.embed_documents(texts, show_progress=False)
     
-    # Compare similarities
+    # Compare similarities (all pairs in one matrix product)
+    similarities = embedder.similarity_matrix(embeddings)
     print("🔍 Similarity Matrix:")
     print("   (1.00 = identical, 0.00 = unrelated)\n")
     
@@ -166,8 +455,7 @@ def test_embeddings():
     for i in range(len(texts)):
         print(f"#{i+1}  ", end="")
         for j in range(len(texts)):
-            sim = embedder.compute_similarity(embeddings[i], embeddings[j])
-            print(f" {sim:.2f}  ", end="")
+            print(f" {similarities[i, j]:.2f}  ", end="")
         print(f"  {texts[i][:30]}...")
     
     print("\n💡 Observations:")
@@ -178,4 +466,6 @@ def test_embeddings():
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    
     test_embeddings()
\ No newline at end of file
@@ -9,10 +9,26 @@ This module handles:
 The LLM is the "brain" that reads the documents and generates answers!
 """
 
-from openai import OpenAI
-from typing import List
+from openai import AsyncOpenAI, OpenAI
+from typing import List, Tuple
+import asyncio
+import logging
+import sys
 from document_loader import Document
 
+logger = logging.getLogger(__name__)
+
+
+SYSTEM_PROMPT = "You are a helpful AI assistant. Answer questions based on the provided context. If the context doesn't contain enough information, say so."
+
+# Fixed part of every prompt; it goes first (see LLM._create_prompt)
+PROMPT_INSTRUCTIONS = """Instructions:
+- Answer the question based on the context provided below
+- If the context contains relevant information, use it in your answer
+- If the context doesn't fully answer the question, say so
+- Be concise and clear
+- Cite which document(s) you used if relevant"""
+
 
 class LLM:
     """
@@ -33,16 +49,22 @@ class LLM:
         if not api_key:
             raise ValueError("OpenAI API key is required!")
         
+        self.api_key = api_key
         self.client = OpenAI(api_key=api_key)
+        # Async client: many requests in flight at once (see abatch_generate)
+        # Created per event loop, see _get_aclient()
+        self._aclient = None
+        self._aclient_loop = None
         self.model = model
         self.temperature = temperature
         self.max_tokens = max_tokens
         
-        print(f"🤖 Initialized LLM: {model}")
-        print(f"   Temperature: {temperature}")
-        print(f"   Max tokens: {max_tokens}\n")
+        logger.info(f"🤖 Initialized LLM: {model}")
+        logger.info(f"   Temperature: {temperature}")
+        logger.info(f"   Max tokens: {max_tokens}\n")
     
-    def generate_response(self, query: str, context_documents: List[Document]) -> str:
+    def generate_response(self, query: str, context_documents: List[Document],
+                          stream: bool = False) -> str:
         """
         Generate a response using the query and retrieved documents
         
@@ -54,48 +76,163 @@ class LLM:
         Args:
             query: The user's question
             context_documents: List of relevant documents
+            stream: Print the answer token by token as it is generated
+                   (the first words appear after a few hundred ms instead
+                   of after the whole answer is done)
         
         Returns:
             The generated answer
         """
-        # Build the context from documents
-        context = self._build_context(context_documents)
-        
-        # Create the prompt
-        prompt = self._create_prompt(query, context)
-        
-        print(f"🤔 Generating response for: '{query}'")
-        print(f"   Using {len(context_documents)} documents as context...")
+        logger.info(f"🤔 Generating response for: '{query}'")
+        logger.info(f"   Using {len(context_documents)} documents as context...")
         
         try:
             # Call OpenAI API
             response = self.client.chat.completions.create(
                 model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a helpful AI assistant. Answer questions based on the provided context. If the context doesn't contain enough information, say so."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
+                messages=self._build_messages(query, context_documents),
                 temperature=self.temperature,
-                max_tokens=self.max_tokens
+                max_tokens=self.max_tokens,
+                stream=stream
             )
             
+            if stream:
+                return self._print_stream(response)
+            
             # Extract the answer
             answer = response.choices[0].message.content
             
-            print(f"✅ Response generated ({len(answer)} characters)\n")
+            logger.info(f"✅ Response generated ({len(answer)} characters)\n")
             return answer
             
         except Exception as e:
             error_msg = f"Error generating response: {e}"
-            print(f"❌ {error_msg}\n")
+            logger.error(f"❌ {error_msg}\n")
+            return error_msg
+    
+    def _print_stream(self, response) -> str:
+        """
+        Print a streamed answer as it arrives
+        
+        Args:
+            response: Streaming response from chat.completions.create(stream=True)
+        
+        Returns:
+            The full answer
+        """
+        print("="*60)
+        print("💡 ANSWER:")
+        print("="*60)
+        
+        parts = []
+        for chunk in response:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                sys.stdout.write(delta)
+                sys.stdout.flush()
+                parts.append(delta)
+        sys.stdout.write("\n")
+        
+        return "".join(parts)
+    
+    async def agenerate_response(self, query: str, context_documents: List[Document]) -> str:
+        """
+        Async version of generate_response()
+        
+        While one request waits for OpenAI, others can be sent.
+        
+        Args:
+            query: The user's question
+            context_documents: List of relevant documents
+        
+        Returns:
+            The generated answer
+        """
+        try:
+            response = await self._get_aclient().chat.completions.create(
+                model=self.model,
+                messages=self._build_messages(query, context_documents),
+                temperature=self.temperature,
+                max_tokens=self.max_tokens
+            )
+            return response.choices[0].message.content
+            
+        except Exception as e:
+            error_msg = f"Error generating response: {e}"
+            logger.error(f"❌ {error_msg}\n")
             return error_msg
     
+    async def abatch_generate(self, pairs: List[Tuple[str, List[Document]]],
+                              concurrency: int = 8) -> List[str]:
+        """
+        Answer many questions concurrently
+        
+        Total time is close to the slowest single request instead of the
+        sum of all of them. A semaphore caps the requests in flight, to
+        stay under the OpenAI rate limits.
+        
+        Args:
+            pairs: List of (question, context documents) pairs
+            concurrency: Maximum number of requests at the same time
+        
+        Returns:
+            The answers, in the same order as pairs
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def generate(query, documents):
+            async with semaphore:
+                return await self.agenerate_response(query, documents)
+        
+        logger.info(f"🤔 Generating {len(pairs)} responses (up to {concurrency} at a time)...")
+        answers = await asyncio.gather(*[generate(query, docs) for query, docs in pairs])
+        logger.info(f"✅ {len(answers)} responses generated\n")
+        return answers
+    
+    def _get_aclient(self) -> AsyncOpenAI:
+        """
+        Async client for the running event loop
+        
+        Its connections belong to the loop that created them, and every
+        asyncio.run() starts a new loop, so the client is recreated when
+        the loop changes.
+        """
+        loop = asyncio.get_running_loop()
+        if self._aclient is None or self._aclient_loop is not loop:
+            self._aclient = AsyncOpenAI(api_key=self.api_key)
+            self._aclient_loop = loop
+        return self._aclient
+    
+    def _build_messages(self, query: str, documents: List[Document]) -> List[dict]:
+        """
+        Build the chat messages sent to OpenAI
+        
+        Args:
+            query: User's question
+            documents: Retrieved documents
+        
+        Returns:
+            List of message dictionaries (system + user)
+        """
+        # Build the context from documents
+        context = self._build_context(documents)
+        
+        # Create the prompt
+        prompt = self._create_prompt(query, context)
+        
+        return [
+            {
+                "role": "system",
+                "content": SYSTEM_PROMPT
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
+    
     def _build_context(self, documents: List[Document]) -> str:
         """
         Build context string from retrieved documents
@@ -109,14 +246,12 @@ class LLM:
         if not documents:
             return "No relevant documents found."
         
-        context_parts = []
-        for i, doc in enumerate(documents, 1):
-            source = doc.metadata.get('source', 'Unknown')
-            content = doc.content.strip()
-            
-            context_parts.append(f"Document {i} (Source: {source}):\n{content}")
-        
-        return "\n\n".join(context_parts)
+        # One join over a generator; chunk text is already stripped when the
+        # documents are split (DocumentLoader.iter_chunks), not on every query
+        return "\n\n".join(
+            f"Document {i} (Source: {doc.metadata.get('source', 'Unknown')}):\n{doc.content}"
+            for i, doc in enumerate(documents, 1)
+        )
     
     def _create_prompt(self, query: str, context: str) -> str:
         """
@@ -125,6 +260,12 @@ class LLM:
         This combines the context and query in a way that encourages
         the LLM to use the documents to answer.
         
+        The parts are ordered from most to least stable: fixed
+        instructions, then the retrieved context, then the question.
+        OpenAI caches long prompt prefixes (1024+ tokens) it has seen
+        recently and bills them at a discount, so the longer the
+        shared beginning of two prompts, the more of it is cached.
+        
         Args:
             query: User's question
             context: Retrieved document context
@@ -132,18 +273,13 @@ class LLM:
         Returns:
             Formatted prompt
         """
-        prompt = f"""Context Information:
+        prompt = f"""{PROMPT_INSTRUCTIONS}
+
+Context Information:
 {context}
 
 Question: {query}
 
-Instructions:
-- Answer the question based on the context provided above
-- If the context contains relevant information, use it in your answer
-- If the context doesn't fully answer the question, say so
-- Be concise and clear
-- Cite which document(s) you used if relevant
-
 Answer:"""
         
         return prompt
@@ -191,6 +327,8 @@ def test_llm(api_key: str):
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    
     import os
     from dotenv import load_dotenv
     
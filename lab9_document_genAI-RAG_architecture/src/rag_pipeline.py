@@ -10,16 +10,42 @@ This is where everything comes together:
 This is the "main controller" of your RAG system.
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Tuple
+import asyncio
+import logging
+import queue
 import time
 
+import numpy as np
+
 from config import Config
 from document_loader import DocumentLoader, Document
-from embeddings import EmbeddingModel
-from vector_store import VectorStore
+from embeddings import EmbeddingModel, EmbeddingCache
+from vector_store import VectorStore, configure_faiss_threads
 from llm import LLM
 
+# Progress messages go through logging, not print(): batch / eval runs can
+# silence them (level WARNING), main() shows them (level from Config.LOG_LEVEL)
+logger = logging.getLogger(__name__)
+
+
+def _run_coroutine(coro):
+    """
+    asyncio.run() that also works when called from a running event loop
+    
+    asyncio.run() refuses to start inside a running loop (Jupyter, async
+    callers), so in that case the coroutine gets its own loop on a
+    helper thread and this call waits for it.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)  # No loop running here
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
 
 class RAGPipeline:
     """
@@ -37,13 +63,20 @@ class RAGPipeline:
         """
         self.config = config or Config
         
-        print("\n" + "="*60)
-        print("🚀 INITIALIZING RAG PIPELINE")
-        print("="*60 + "\n")
+        logger.info("\n" + "="*60)
+        logger.info("🚀 INITIALIZING RAG PIPELINE")
+        logger.info("="*60 + "\n")
         
         # Initialize components
         self.document_loader = DocumentLoader(self.config.DATA_DIR)
-        self.embedding_model = EmbeddingModel(self.config.EMBEDDING_MODEL)
+        self.embedding_model = EmbeddingModel(
+            self.config.EMBEDDING_MODEL,
+            quantized_model_dir=self.config.QUANTIZED_EMBEDDING_MODEL_DIR
+        )
+        self.embedding_cache = EmbeddingCache(self.config.EMBEDDING_CACHE_DB)
+        
+        faiss_threads = configure_faiss_threads(self.config.FAISS_THREADS)
+        logger.info(f"🧵 FAISS using {faiss_threads} CPU threads\n")
         self.vector_store: Optional[VectorStore] = None
         self.llm: Optional[LLM] = None
         
@@ -56,8 +89,33 @@ class RAGPipeline:
                 max_tokens=self.config.LLM_MAX_TOKENS
             )
         else:
-            print("⚠️  LLM not initialized - OpenAI API key not found")
-            print("   You can still build the vector database!\n")
+            logger.warning("⚠️  LLM not initialized - OpenAI API key not found")
+            logger.warning("   You can still build the vector database!\n")
+        
+        # Pay the one-off model / thread-pool start-up cost now, not on question #1
+        self._warmed_store: Optional[VectorStore] = None
+        self._warmed = False
+        self.embedding_model.embed_text("warmup")
+        self._warmup()
+    
+    def _warmup(self):
+        """
+        Run a throwaway search so the first real query is not slow
+        
+        The first FAISS search spawns the OpenMP thread pool (and copies
+        the index to the GPU, if any). The vector store only exists after
+        build_index() / load_index(), so those call this again.
+        """
+        if self.vector_store is None or self.vector_store is self._warmed_store:
+            return
+        
+        dummy = np.zeros((1, self.embedding_model.dimension), dtype='float32')
+        self.vector_store.search(dummy, top_k=1)
+        self._warmed_store = self.vector_store
+        
+        if not self._warmed:
+            logger.info("🔥 Pipeline warmed\n")
+            self._warmed = True
     
     def build_index(self, force_rebuild: bool = False):
         """
@@ -70,73 +128,167 @@ class RAGPipeline:
         4. Store in FAISS vector database
         5. Save to disk
         
+        Steps 1-4 run as a pipeline (see _build_index_pipelined), so files are
+        read and split while earlier chunks are being embedded.
+        
         Args:
             force_rebuild: If True, rebuild even if index exists
         """
-        print("\n" + "="*60)
-        print("🔨 BUILDING VECTOR DATABASE")
-        print("="*60 + "\n")
+        logger.info("\n" + "="*60)
+        logger.info("🔨 BUILDING VECTOR DATABASE")
+        logger.info("="*60 + "\n")
         
         # Check if index already exists
         if not force_rebuild and self.config.VECTOR_DB_PATH.exists():
-            print(f"📂 Vector database already exists at {self.config.VECTOR_DB_PATH}")
+            logger.info(f"📂 Vector database already exists at {self.config.VECTOR_DB_PATH}")
             user_input = input("   Rebuild? (y/n): ").strip().lower()
             if user_input != 'y':
-                print("   Loading existing database...\n")
-                self.load_index()
-                return
+                logger.info("   Loading existing database...\n")
+                if self.load_index():
+                    return
+                logger.warning("   Rebuilding...\n")
         
         start_time = time.time()
         
-        # Step 1: Load documents
-        print("Step 1/4: Loading documents...")
-        documents = self.document_loader.load_documents()
+        # Steps 1-4: Load, split, embed and store (pipelined)
+        logger.info("Steps 1-4: Loading, splitting and embedding documents (pipelined)...")
+        num_chunks = self._build_index_pipelined()
         
-        if not documents:
-            print("❌ No documents found! Add .txt files to the data folder.")
+        if num_chunks == 0:
+            logger.error("❌ No documents found! Add .txt files to the data folder.")
+            self.vector_store = None
             return
         
-        # Step 2: Split into chunks
-        print("Step 2/4: Splitting documents into chunks...")
-        chunks = self.document_loader.split_documents(
-            documents,
-            chunk_size=self.config.CHUNK_SIZE,
-            chunk_overlap=self.config.CHUNK_OVERLAP
-        )
-        
-        # Step 3: Create embeddings
-        print("Step 3/4: Creating embeddings...")
-        chunk_texts = [chunk.content for chunk in chunks]
-        embeddings = self.embedding_model.embed_documents(chunk_texts)
-        
-        # Step 4: Build vector store
-        print("Step 4/4: Building vector store...")
-        self.vector_store = VectorStore(dimension=self.embedding_model.dimension)
-        self.vector_store.add_documents(chunks, embeddings)
-        
         # Save to disk
-        print("💾 Saving vector database...")
+        logger.info("💾 Saving vector database...")
         self.vector_store.save(self.config.VECTOR_DB_PATH)
+        self._warmup()
         
         elapsed = time.time() - start_time
-        print(f"\n✅ Index built successfully in {elapsed:.2f} seconds!")
-        print("="*60 + "\n")
+        logger.info(f"\n✅ Index built successfully in {elapsed:.2f} seconds!")
+        logger.info("="*60 + "\n")
+    
+    def _build_index_pipelined(self) -> int:
+        """
+        Fill a new vector store through a three-stage pipeline
+        
+        producer -> [queue] -> embedder -> [queue] -> indexer
+        
+        - producer (thread): reads and splits files, sends chunk batches
+        - embedder (thread): embeds each batch
+          (the model releases the GIL, so the producer keeps going)
+        - indexer (this thread): adds embedded batches to FAISS
+        
+        Total time is about max(split, embed) instead of split + embed.
+        The bounded queues keep memory flat on big corpora. Plain threads
+        (no event loop) so this also works when called from Jupyter or
+        other async code.
+        
+        Returns:
+            Number of chunks added
+        """
+        self.vector_store = VectorStore(
+            dimension=self.embedding_model.dimension,
+            index_string=self.config.INDEX_STRING,
+            flat_threshold=self.config.FLAT_INDEX_THRESHOLD,
+            ef_search=self.config.HNSW_EF_SEARCH,
+            nprobe=self.config.IVF_NPROBE,
+            use_gpu=self.config.USE_GPU_FAISS,
+            exact_backend=self.config.EXACT_BACKEND,
+            usearch_max_size=self.config.USEARCH_MAX_SIZE
+        )
+        
+        batch_size = self.config.BUILD_BATCH_SIZE
+        chunk_queue = queue.Queue(maxsize=self.config.BUILD_QUEUE_SIZE)
+        embedded_queue = queue.Queue(maxsize=self.config.BUILD_QUEUE_SIZE)
+        
+        def drain(q):
+            # Let a stage blocked on a full queue finish after a failure
+            while q.get() is not None:
+                pass
+        
+        def produce():
+            try:
+                chunks = self.document_loader.iter_chunks(
+                    self.document_loader.iter_documents(),
+                    chunk_size=self.config.CHUNK_SIZE,
+                    chunk_overlap=self.config.CHUNK_OVERLAP
+                )
+                batch = []
+                for chunk in chunks:
+                    batch.append(chunk)
+                    if len(batch) == batch_size:
+                        chunk_queue.put(batch)
+                        batch = []
+                if batch:
+                    chunk_queue.put(batch)
+            finally:
+                chunk_queue.put(None)  # No more batches
+        
+        def embed():
+            done = False
+            try:
+                while True:
+                    batch = chunk_queue.get()
+                    if batch is None:
+                        done = True
+                        break
+                    embeddings = self.embedding_model.embed_with_cache(
+                        [chunk.content for chunk in batch],
+                        self.embedding_cache
+                    )
+                    embedded_queue.put((batch, embeddings))
+            finally:
+                embedded_queue.put(None)
+                if not done:
+                    drain(chunk_queue)
+        
+        num_chunks = 0
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            stages = [executor.submit(produce), executor.submit(embed)]
+            try:
+                while True:
+                    item = embedded_queue.get()
+                    if item is None:
+                        break
+                    batch, embeddings = item
+                    self.vector_store.add_documents(batch, embeddings)
+                    num_chunks += len(batch)
+            except BaseException:
+                drain(embedded_queue)
+                raise
+            for stage in stages:
+                stage.result()  # Re-raise a producer / embedder error
+        return num_chunks
     
     def load_index(self):
         """
         Load an existing vector database from disk
         """
         if not self.config.VECTOR_DB_PATH.exists():
-            print(f"❌ Vector database not found at {self.config.VECTOR_DB_PATH}")
-            print("   Run build_index() first!")
+            logger.error(f"❌ Vector database not found at {self.config.VECTOR_DB_PATH}")
+            logger.error("   Run build_index() first!")
             return False
         
-        print("📂 Loading vector database...")
-        self.vector_store = VectorStore.load(
-            self.config.VECTOR_DB_PATH,
-            dimension=self.embedding_model.dimension
-        )
-        print("✅ Vector database loaded!\n")
+        logger.info("📂 Loading vector database...")
+        try:
+            self.vector_store = VectorStore.load(
+                self.config.VECTOR_DB_PATH,
+                dimension=self.embedding_model.dimension,
+                ef_search=self.config.HNSW_EF_SEARCH,
+                nprobe=self.config.IVF_NPROBE,
+                use_gpu=self.config.USE_GPU_FAISS,
+                exact_backend=self.config.EXACT_BACKEND,
+                usearch_max_size=self.config.USEARCH_MAX_SIZE
+            )
+        except FileNotFoundError as e:
+            # e.g. a database saved in the old documents.pkl + L2 format,
+            # which cannot be converted (the scores are now cosine)
+            logger.warning(f"⚠️  Old or incomplete vector database format: {e}")
+            logger.warning("   Rebuild it with build_index(force_rebuild=True)")
+            return False
+        logger.info("✅ Vector database loaded!\n")
+        self._warmup()
         return True
     
     def query(self, question: str, top_k: int = None) -> dict:
@@ -156,67 +308,154 @@ class RAGPipeline:
         Returns:
             Dictionary with answer, sources, and metadata
         """
+        return self.query_batch([question], top_k=top_k)[0]
+    
+    def query_batch(self, questions: List[str], top_k: int = None) -> List[dict]:
+        """
+        Answer several questions using RAG
+        
+        Questions are handled in groups of RETRIEVAL_BATCH_SIZE:
+        - Steps 1 and 2 run once per group: all its questions are
+          embedded in one model call and searched in one FAISS call.
+        - In step 3 the LLM requests of a group run concurrently.
+        - While the LLM answers one group, a worker thread already
+          embeds and searches the next one.
+        
+        Args:
+            questions: List of questions
+            top_k: Number of documents to retrieve per question
+        
+        Returns:
+            One result dictionary per question (see query())
+        """
         if self.vector_store is None:
-            return {
+            return [{
                 "error": "Vector store not loaded. Run build_index() or load_index() first!"
-            }
+            } for _ in questions]
         
         if self.llm is None:
-            return {
+            return [{
                 "error": "LLM not initialized. Add OPENAI_API_KEY to .env file!"
-            }
+            } for _ in questions]
         
-        top_k = top_k or self.config.TOP_K_RESULTS
+        if not questions:
+            return []
         
-        print("\n" + "="*60)
-        print(f"❓ QUESTION: {question}")
-        print("="*60 + "\n")
+        top_k = top_k or self.config.TOP_K_RESULTS
         
-        start_time = time.time()
+        group_size = self.config.RETRIEVAL_BATCH_SIZE
+        groups = [questions[i:i + group_size] for i in range(0, len(questions), group_size)]
+        
+        answers = []
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            start_time = time.time()
+            
+            # Steps 1-2 for the first group
+            logger.info(f"\n🔄 Step 1/3: Creating embeddings for {len(groups[0])} question(s)...")
+            logger.info(f"🔍 Step 2/3: Searching for top {top_k} relevant documents...")
+            retrieval = executor.submit(self._retrieve, groups[0], top_k)
+            
+            for n, group in enumerate(groups):
+                all_results = retrieval.result()
+                
+                # Start steps 1-2 for the next group in the background...
+                if n + 1 < len(groups):
+                    retrieval = executor.submit(self._retrieve, groups[n + 1], top_k)
+                
+                # ...while step 3 runs for this one
+                answers.extend(self._answer_group(group, all_results, start_time))
+                start_time = time.time()
         
-        # Step 1: Embed the question
-        print("🔄 Step 1/3: Creating question embedding...")
-        question_embedding = self.embedding_model.embed_text(question)
+        return answers
+    
+    def _retrieve(self, questions: List[str], top_k: int) -> List[List[Tuple[Document, float]]]:
+        """
+        Steps 1-2 for a group of questions: embed them all, search them all
         
-        # Step 2: Search for relevant documents
-        print(f"🔍 Step 2/3: Searching for top {top_k} relevant documents...")
-        results = self.vector_store.search(question_embedding, top_k=top_k)
+        Args:
+            questions: List of questions
+            top_k: Number of documents to retrieve per question
         
-        print(f"\n📚 Retrieved {len(results)} documents:")
-        for i, (doc, score) in enumerate(results, 1):
-            source = doc.metadata.get('source', 'Unknown')
-            print(f"   {i}. {source} (similarity: {score:.4f})")
-            print(f"      Preview: {doc.content[:80]}...")
-        print()
+        Returns:
+            One list of (Document, score) tuples per question
+        """
+        question_embeddings = self.embedding_model.embed_with_cache(questions, self.embedding_cache)
+        return self.vector_store.search_batch(question_embeddings, top_k=top_k)
+    
+    def _answer_group(self, questions: List[str], all_results: List[List[Tuple[Document, float]]],
+                      start_time: float) -> List[dict]:
+        """
+        Step 3 for a group of questions: print the sources, ask the LLM
         
-        # Step 3: Generate answer using LLM
-        print("🤖 Step 3/3: Generating answer with LLM...")
-        documents = [doc for doc, score in results]
-        answer = self.llm.generate_response(question, documents)
+        Args:
+            questions: List of questions
+            all_results: Retrieved (Document, score) tuples per question
+            start_time: When work on this group started (for timing)
         
-        elapsed = time.time() - start_time
+        Returns:
+            One result dictionary per question (see query())
+        """
+        for question, results in zip(questions, all_results):
+            logger.info("\n" + "="*60)
+            logger.info(f"❓ QUESTION: {question}")
+            logger.info("="*60 + "\n")
+            
+            # (building the preview lines is skipped when nobody will see them)
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(f"📚 Retrieved {len(results)} documents:")
+                for i, (doc, score) in enumerate(results, 1):
+                    source = doc.metadata.get('source', 'Unknown')
+                    logger.info(f"   {i}. {source} (similarity: {score:.4f})")
+                    logger.info(f"      Preview: {doc.content[:80]}...")
+                logger.info("")
+        
+        # Step 3: Generate answers using LLM
+        # (several questions: the requests are sent concurrently)
+        logger.info("🤖 Step 3/3: Generating answer with LLM...")
+        pairs = [
+            (question, [doc for doc, score in results])
+            for question, results in zip(questions, all_results)
+        ]
+        # (one question: the answer is printed while it is being generated)
+        streamed = len(pairs) == 1 and self.config.LLM_STREAM
+        if len(pairs) == 1:
+            generated = [self.llm.generate_response(*pairs[0], stream=streamed)]
+        else:
+            generated = _run_coroutine(
+                self.llm.abatch_generate(pairs, concurrency=self.config.LLM_CONCURRENCY)
+            )
         
-        print("="*60)
-        print("💡 ANSWER:")
-        print("="*60)
-        print(answer)
-        print("="*60)
-        print(f"⏱️  Completed in {elapsed:.2f} seconds\n")
-        
-        # Return structured result
-        return {
-            "question": question,
-            "answer": answer,
-            "sources": [
-                {
-                    "content": doc.content,
-                    "metadata": doc.metadata,
-                    "similarity": score
-                }
-                for doc, score in results
-            ],
-            "time_taken": elapsed
-        }
+        # Total time, split evenly between the questions
+        elapsed = (time.time() - start_time) / len(questions)
+        
+        answers = []
+        for question, results, answer in zip(questions, all_results, generated):
+            # The answer itself is output, not a log message (the streamed
+            # answer is printed too, by LLM._print_stream)
+            if not streamed:
+                print("="*60)
+                print(f"💡 ANSWER: {question}" if len(questions) > 1 else "💡 ANSWER:")
+                print("="*60)
+                print(answer)
+            print("="*60)
+            logger.info(f"⏱️  Completed in {elapsed:.2f} seconds\n")
+            
+            # Structured result
+            answers.append({
+                "question": question,
+                "answer": answer,
+                "sources": [
+                    {
+                        "content": doc.content,
+                        "metadata": doc.metadata,
+                        "similarity": score
+                    }
+                    for doc, score in results
+                ],
+                "time_taken": elapsed
+            })
+        
+        return answers
     
     def interactive_mode(self):
         """
@@ -265,6 +504,9 @@ def main():
     """
     Main function to demonstrate the RAG pipeline
     """
+    # Show the pipeline's progress messages
+    logging.basicConfig(level=Config.LOG_LEVEL, format="%(message)s")
+    
     # Validate configuration
     config = Config
     config.print_config()
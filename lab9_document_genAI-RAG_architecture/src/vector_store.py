@@ -17,37 +17,209 @@ it finds the most similar document vectors instantly!
 """
 
 import faiss
+import json
+import logging
+import mmap
 import numpy as np
-import pickle
+import os
 from pathlib import Path
-from typing import List, Tuple
+from typing import Iterator, List, Optional, Sequence, Tuple
 from document_loader import Document
 
+logger = logging.getLogger(__name__)
+
+# Metadata is saved as JSON: orjson reads and writes it several times
+# faster than the stdlib (and, unlike pickle, loading can't run code).
+# Fall back to json if it isn't installed.
+try:
+    import orjson
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj).encode('utf-8')
+    _loads = json.loads
+
+
+class MappedTexts:
+    """
+    Read-only list of strings, stored in one memory-mapped file
+    
+    All texts are saved back to back (UTF-8) in a .bin file, and an
+    offsets array says where text i starts and ends. Opening the store
+    reads nothing: text i is decoded only when it is accessed, and the
+    OS pages in just the bytes needed.
+    """
+    
+    def __init__(self, blob_file: Path, offsets_file: Path):
+        self.offsets = np.load(offsets_file, mmap_mode='r')
+        
+        if os.path.getsize(blob_file) > 0:
+            with open(blob_file, 'rb') as f:
+                self.blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.blob = b''  # mmap can't map an empty file
+    
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+    
+    def __getitem__(self, i: int) -> str:
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].decode('utf-8')
+    
+    def __iter__(self) -> Iterator[str]:
+        for i in range(len(self)):
+            yield self[i]
+    
+    @staticmethod
+    def write(texts: Sequence[str], blob_file: Path, offsets_file: Path):
+        """Save texts in the layout read by MappedTexts"""
+        encoded = [text.encode('utf-8') for text in texts]
+        
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+        
+        with open(blob_file, 'wb') as f:
+            f.write(b''.join(encoded))
+        with open(offsets_file, 'wb') as f:
+            np.save(f, offsets)
+
+
+# Optional exact-search backend for small collections
+try:
+    from usearch.index import search as usearch_search, MetricKind
+except ImportError:
+    usearch_search = None
+
+# Vectors are added to FAISS this many at a time: the index grows in
+# steps (no second full-size copy inside FAISS) and progress is visible
+ADD_BATCH_SIZE = 4096
+
+
+def configure_faiss_threads(num_threads: Optional[int] = None) -> int:
+    """
+    Set how many threads FAISS uses (OpenMP) for searching and building
+    
+    The OpenMP default doesn't always match the CPUs this process may
+    actually use (containers, taskset), which leaves cores idle or
+    oversubscribes them.
+    
+    Args:
+        num_threads: Thread count; None = number of CPUs available to this process
+    
+    Returns:
+        The thread count now in use
+    """
+    if num_threads is None:
+        if hasattr(os, 'sched_getaffinity'):
+            num_threads = len(os.sched_getaffinity(0))
+        else:
+            num_threads = os.cpu_count() or 1
+    
+    faiss.omp_set_num_threads(num_threads)
+    return num_threads
+
+
+def _min_training_points(index: faiss.Index) -> int:
+    """
+    How many vectors an untrained index needs before train() works well
+    
+    k-means (IVF clusters, PQ codebooks) wants about 39 points per
+    centroid; FAISS refuses to train with fewer points than centroids.
+    """
+    if index.is_trained:
+        return 0
+    ivf = faiss.try_extract_index_ivf(index)
+    inner = faiss.downcast_index(ivf if ivf is not None else index)
+    pq = getattr(inner, 'pq', None)
+    centroids = max(ivf.nlist if ivf is not None else 1,
+                    pq.ksub if pq is not None else 1)
+    return 39 * centroids if centroids > 1 else 1
+
+
+def _tmp(path: Path) -> Path:
+    """Temp file next to path, renamed over it with os.replace() when complete"""
+    return path.with_name(path.name + '.tmp')
+
 
 class VectorStore:
     """
     Vector database using FAISS for similarity search
     """
     
-    def __init__(self, dimension: int):
+    def __init__(self, dimension: int, index_string: Optional[str] = None,
+                 flat_threshold: int = 2000, ef_search: int = 64, nprobe: int = 8,
+                 use_gpu: bool = False, exact_backend: str = "faiss",
+                 usearch_max_size: int = 100_000):
         """
         Initialize the vector store
         
         Args:
             dimension: The size of each embedding vector (e.g., 384 for MiniLM)
+            index_string: FAISS index_factory description of an approximate
+                         and/or compressed index, e.g. "HNSW32", "SQ8"
+                         (int8 vectors) or "IVF1024,Flat".
+                         None = always use exact float32 search
+            flat_threshold: Collections smaller than this keep the exact
+                         index (brute force is already fast enough there).
+                         Raised automatically to what index_string needs
+                         for training (about 39 x nlist for IVF)
+            ef_search: HNSW search depth (higher = more accurate, slower)
+            nprobe: Number of IVF clusters visited per query
+            use_gpu: Search on the GPU(s) if FAISS sees any (needs the
+                     faiss-gpu package; ignored otherwise)
+            exact_backend: "faiss", or "usearch" to run exact searches with
+                     USearch's SIMD kernels (several times faster than
+                     IndexFlat on small collections; needs `usearch`)
+            usearch_max_size: Above this many vectors, exact search goes
+                     back to FAISS
         """
         self.dimension = dimension
+        self.index_string = index_string
+        self.flat_threshold = flat_threshold
+        self.ef_search = ef_search
+        self.nprobe = nprobe
+        
+        # Check index_string now (not when the collection gets big) and
+        # learn how many vectors it needs for training: the switch below
+        # waits until there are at least that many
+        self.switch_threshold = flat_threshold
+        if index_string:
+            try:
+                probe = faiss.index_factory(dimension, index_string, faiss.METRIC_INNER_PRODUCT)
+            except RuntimeError as e:
+                raise ValueError(f"Invalid FAISS index string {index_string!r}: {e}") from e
+            self.switch_threshold = max(flat_threshold, _min_training_points(probe))
         
         # Create a FAISS index
-        # We use IndexFlatL2 = exact search using L2 (Euclidean) distance
-        # This is simple and accurate, perfect for learning!
-        self.index = faiss.IndexFlatL2(dimension)
+        # We start with IndexFlatIP = exact search using the inner (dot) product
+        # All vectors are normalized to length 1, so the dot product IS the
+        # cosine similarity - no distance-to-score conversion needed.
+        # Big collections switch to index_string in add_documents()
+        self.index = faiss.IndexFlatIP(dimension)
         
         # Store the actual documents
         # (FAISS only stores vectors, not the original text)
-        self.documents: List[Document] = []
+        # Kept as two parallel columns instead of a list of Document
+        # objects: row i of each column belongs to vector i. Document
+        # objects are only created for search results.
+        self.contents: Sequence[str] = []
+        self.metadata: List[dict] = []
+        
+        # True after load(memory_map=True): data is served from read-only files
+        self.read_only = False
         
-        print(f"🗄️  Initialized vector store (dimension: {dimension})")
+        # GPU copy of the index, used for searching (the CPU index stays
+        # the one that is added to and saved). Created on the first search.
+        self.use_gpu = use_gpu and faiss.get_num_gpus() > 0
+        self.gpu_index = None
+        
+        self.use_usearch = exact_backend == "usearch"
+        if self.use_usearch and usearch_search is None:
+            logger.warning("⚠️  usearch not installed - using FAISS for exact search")
+            self.use_usearch = False
+        self.usearch_max_size = usearch_max_size
+        
+        logger.info(f"🗄️  Initialized vector store (dimension: {dimension})")
     
     def add_documents(self, documents: List[Document], embeddings: np.ndarray):
         """
@@ -63,18 +235,134 @@ class VectorStore:
         if embeddings.shape[1] != self.dimension:
             raise ValueError(f"Embedding dimension {embeddings.shape[1]} doesn't match index dimension {self.dimension}")
         
-        # Convert to float32 (FAISS requirement)
-        embeddings_f32 = embeddings.astype('float32')
+        if self.read_only:
+            raise ValueError("Vector store was loaded memory-mapped (read-only); "
+                             "use VectorStore.load(..., memory_map=False) to add documents")
+        
+        # Convert to a C-ordered, aligned float32 array (FAISS requirement;
+        # lets its SIMD kernels read the rows directly).
+        # No copy if the embeddings already have that layout.
+        embeddings_f32 = np.require(embeddings, dtype=np.float32, requirements=['C', 'A'])
+        
+        # Normalize to length 1 (skipped if the model already did it)
+        squared_norms = np.einsum('ij,ij->i', embeddings_f32, embeddings_f32)
+        if not np.allclose(squared_norms, 1.0, atol=1e-4):
+            if np.shares_memory(embeddings_f32, embeddings):
+                embeddings_f32 = embeddings_f32.copy()  # Don't modify the caller's array
+            faiss.normalize_L2(embeddings_f32)
+        
+        # Collection just got big: move to an approximate index instead of
+        # brute force (vectors already in the flat index are carried over,
+        # so documents can be added in many small batches)
+        if (self.index_string and isinstance(self.index, faiss.IndexFlat)
+                and self.index.ntotal + len(embeddings_f32) >= self.switch_threshold):
+            if self.index.ntotal > 0:
+                existing = self.index.reconstruct_n(0, self.index.ntotal)
+                embeddings_f32 = np.concatenate([existing, embeddings_f32])
+            self.index = faiss.index_factory(self.dimension, self.index_string,
+                                             faiss.METRIC_INNER_PRODUCT)
+            self.set_search_params(self.ef_search, self.nprobe)
+            logger.info(f"⚡ Switching to index: {self.index_string}")
         
-        # Add to FAISS index
-        self.index.add(embeddings_f32)
+        # IVF / SQ / PQ indexes must learn their clusters / value ranges
+        # before vectors can be added
+        if not self.index.is_trained:
+            try:
+                self.index.train(embeddings_f32)
+            except RuntimeError as e:
+                raise ValueError(f"Could not train index {self.index_string!r} on "
+                                 f"{len(embeddings_f32)} vectors: {e}") from e
+            if not self.index.is_trained:
+                raise ValueError(f"Index {self.index_string!r} is still untrained "
+                                 f"after {len(embeddings_f32)} vectors")
         
-        # Store documents
-        self.documents.extend(documents)
+        # Add to FAISS index, in batches
+        total = len(embeddings_f32)
+        for start in range(0, total, ADD_BATCH_SIZE):
+            self.index.add(embeddings_f32[start:start + ADD_BATCH_SIZE])
+            if total > ADD_BATCH_SIZE:
+                logger.info(f"   Indexed {min(start + ADD_BATCH_SIZE, total)}/{total} vectors")
+        self.gpu_index = None  # Outdated, copied again on the next search
         
-        print(f"➕ Added {len(documents)} documents to vector store")
-        print(f"   Total documents: {len(self.documents)}")
-        print(f"   Index size: {self.index.ntotal}\n")
+        # Store documents (column by column, one list concatenation each)
+        self.contents += [doc.content for doc in documents]
+        self.metadata += [doc.metadata for doc in documents]
+        
+        logger.info(f"➕ Added {len(documents)} documents to vector store")
+        logger.info(f"   Total documents: {len(self.contents)}")
+        logger.info(f"   Index size: {self.index.ntotal}\n")
+    
+    def set_search_params(self, ef_search: Optional[int] = None, nprobe: Optional[int] = None):
+        """
+        Tune the speed / accuracy trade-off of approximate indexes
+        
+        Ignored by the exact (flat) index.
+        
+        Args:
+            ef_search: HNSW search depth
+            nprobe: Number of IVF clusters visited per query
+        """
+        self.gpu_index = None  # Copied again with the new settings
+        
+        if ef_search is not None:
+            self.ef_search = ef_search
+            if hasattr(self.index, 'hnsw'):
+                self.index.hnsw.efSearch = ef_search
+        
+        if nprobe is not None:
+            self.nprobe = nprobe
+            try:
+                faiss.extract_index_ivf(self.index).nprobe = nprobe
+            except RuntimeError:
+                pass  # Not an IVF index
+    
+    def _search_index(self):
+        """
+        Index to run searches on: a GPU copy if enabled, else the CPU index
+        
+        Not every index type runs on GPU (e.g. HNSW); those stay on CPU.
+        """
+        if not self.use_gpu:
+            return self.index
+        
+        if self.gpu_index is None:
+            try:
+                self.gpu_index = faiss.index_cpu_to_all_gpus(self.index)
+                logger.info(f"🚀 Copied index to {faiss.get_num_gpus()} GPU(s)")
+            except RuntimeError as e:
+                logger.warning(f"⚠️  Index can't run on GPU, searching on CPU: {e}")
+                self.use_gpu = False
+                return self.index
+        
+        return self.gpu_index
+    
+    def _can_use_usearch(self) -> bool:
+        """USearch handles exact (flat) indexes up to usearch_max_size vectors"""
+        return (self.use_usearch
+                and isinstance(self.index, faiss.IndexFlat)
+                and 0 < self.index.ntotal <= self.usearch_max_size)
+    
+    def _usearch_exact(self, query_f32: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Exact inner-product search with USearch over the flat index's vectors
+        
+        The vectors are read in place from FAISS's own storage (no copy).
+        
+        Returns:
+            (similarities, indices), shaped like FAISS's search() output
+        """
+        matrix = faiss.rev_swig_ptr(
+            self.index.get_xb(), self.index.ntotal * self.dimension
+        ).reshape(self.index.ntotal, self.dimension)
+        
+        matches = usearch_search(matrix, query_f32, min(top_k, self.index.ntotal),
+                                 MetricKind.IP, exact=True)
+        
+        # USearch returns the inner-product *distance* (1 - dot product),
+        # and 1-D arrays for a single query
+        num_queries = len(query_f32)
+        similarities = 1.0 - matches.distances.reshape(num_queries, -1)
+        return similarities, matches.keys.reshape(num_queries, -1)
     
     def search(self, query_embedding: np.ndarray, top_k: int = 3) -> List[Tuple[Document, float]]:
         """
@@ -86,35 +374,68 @@ class VectorStore:
         
         Returns:
             List of (Document, score) tuples, sorted by relevance
-            Lower scores = more similar (L2 distance)
+            Score = cosine similarity (-1 to 1, higher = more similar)
         """
         # Ensure query is the right shape
         if query_embedding.ndim == 1:
             query_embedding = query_embedding.reshape(1, -1)
         
-        # Convert to float32
-        query_f32 = query_embedding.astype('float32')
+        return self.search_batch(query_embedding, top_k)[0]
+    
+    def search_batch(self, query_embeddings: np.ndarray, top_k: int = 3) -> List[List[Tuple[Document, float]]]:
+        """
+        Search for several queries at once
+        
+        FAISS compares the whole query matrix against the index in one
+        BLAS call, which is much faster than one search() per query.
         
-        # Search
-        # D = distances, I = indices
-        distances, indices = self.index.search(query_f32, top_k)
+        Args:
+            query_embeddings: numpy array of shape (num_queries, dimension)
+            top_k: Number of results to return per query
+        
+        Returns:
+            One list of (Document, score) tuples per query (see search())
+        """
+        # Convert to float32 and normalize (like the stored vectors)
+        query_f32 = query_embeddings.astype('float32')
+        faiss.normalize_L2(query_f32)
         
-        # Get the documents and their scores
-        results = []
-        for dist, idx in zip(distances[0], indices[0]):
-            if idx < len(self.documents):  # Make sure index is valid
-                doc = self.documents[idx]
-                # Convert L2 distance to similarity score (0-1, higher = more similar)
-                # We use a simple conversion: similarity = 1 / (1 + distance)
-                similarity = 1 / (1 + dist)
-                results.append((doc, similarity))
+        # Search
+        # D = distances, I = indices, both of shape (num_queries, top_k)
+        if self._can_use_usearch():
+            distances, indices = self._usearch_exact(query_f32, top_k)
+        else:
+            distances, indices = self._search_index().search(query_f32, top_k)
         
-        return results
+        # Build Document objects for the results only
+        # (the inner product of unit vectors is already the cosine similarity,
+        # so the scores need no conversion)
+        # tolist() turns both matrices into Python floats / ints in one C
+        # call, instead of creating a numpy scalar per element
+        contents, metadata = self.contents, self.metadata
+        num_docs = len(contents)
+        return [
+            [
+                (Document(contents[idx], metadata[idx]), similarity)
+                for similarity, idx in zip(row_similarities, row_indices)
+                if 0 <= idx < num_docs  # Make sure index is valid (-1 = no result)
+            ]
+            for row_similarities, row_indices in zip(distances.tolist(), indices.tolist())
+        ]
     
     def save(self, path: Path):
         """
         Save the vector store to disk
         
+        Files:
+        - faiss.index: the vectors
+        - contents.bin + contents_offsets.npy: the texts (see MappedTexts)
+        - metadata.json: the metadata dictionaries
+        
+        Every file is written under a temp name and then renamed, so a
+        store that is currently memory-mapped (even by this process) is
+        never overwritten in place.
+        
         Args:
             path: Directory path to save the store
         """
@@ -123,52 +444,73 @@ class VectorStore:
         
         # Save FAISS index
         index_file = path / "faiss.index"
-        faiss.write_index(self.index, str(index_file))
+        faiss.write_index(self.index, str(_tmp(index_file)))
         
-        # Save documents using pickle
-        docs_file = path / "documents.pkl"
-        with open(docs_file, 'wb') as f:
-            pickle.dump(self.documents, f)
+        # Save texts (memory-mappable layout)
+        blob_file = path / "contents.bin"
+        offsets_file = path / "contents_offsets.npy"
+        MappedTexts.write(self.contents, _tmp(blob_file), _tmp(offsets_file))
         
-        print(f"💾 Saved vector store to {path}")
+        # Save metadata as JSON
+        metadata_file = path / "metadata.json"
+        with open(_tmp(metadata_file), 'wb') as f:
+            f.write(_dumps(self.metadata))
+        
+        for file in (index_file, blob_file, offsets_file, metadata_file):
+            os.replace(_tmp(file), file)
+        
+        logger.info(f"💾 Saved vector store to {path}")
     
     @classmethod
-    def load(cls, path: Path, dimension: int) -> 'VectorStore':
+    def load(cls, path: Path, dimension: int, memory_map: bool = True, **kwargs) -> 'VectorStore':
         """
         Load a vector store from disk
         
+        With memory_map=True (default) the FAISS index and the texts are
+        memory-mapped instead of read into RAM: loading is instant even
+        for huge stores, and only the parts that searches touch are ever
+        read from disk. The store is then read-only.
+        
         Args:
             path: Directory path where the store is saved
             dimension: Embedding dimension
+            memory_map: Memory-map the files (read-only) instead of reading them
+            **kwargs: Search settings passed to VectorStore()
+                     (ef_search, nprobe, use_gpu, exact_backend, usearch_max_size)
         
         Returns:
             Loaded VectorStore instance
         """
         path = Path(path)
-        
-        # Load FAISS index
         index_file = path / "faiss.index"
-        if not index_file.exists():
-            raise FileNotFoundError(f"Index file not found: {index_file}")
+        blob_file = path / "contents.bin"
+        offsets_file = path / "contents_offsets.npy"
+        metadata_file = path / "metadata.json"
         
-        # Load documents
-        docs_file = path / "documents.pkl"
-        if not docs_file.exists():
-            raise FileNotFoundError(f"Documents file not found: {docs_file}")
+        for file in (index_file, blob_file, offsets_file, metadata_file):
+            if not file.exists():
+                raise FileNotFoundError(f"Vector store file not found: {file}")
         
         # Create new instance
-        store = cls(dimension)
+        store = cls(dimension, **kwargs)
         
-        # Load index
-        store.index = faiss.read_index(str(index_file))
+        # Load index and texts
+        if memory_map:
+            store.index = faiss.read_index(str(index_file), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+            store.contents = MappedTexts(blob_file, offsets_file)
+            store.read_only = True
+        else:
+            store.index = faiss.read_index(str(index_file))
+            store.contents = list(MappedTexts(blob_file, offsets_file))
+        store.set_search_params(store.ef_search, store.nprobe)
         
-        # Load documents
-        with open(docs_file, 'rb') as f:
-            store.documents = pickle.load(f)
+        # Load metadata
+        with open(metadata_file, 'rb') as f:
+            store.metadata = _loads(f.read())
         
-        print(f"📂 Loaded vector store from {path}")
-        print(f"   Documents: {len(store.documents)}")
-        print(f"   Index size: {store.index.ntotal}\n")
+        logger.info(f"📂 Loaded vector store from {path}")
+        logger.info(f"   Documents: {len(store.contents)}")
+        logger.info(f"   Index size: {store.index.ntotal}\n")
         
         return store
     
@@ -178,9 +520,14 @@ class VectorStore:
         print("📊 VECTOR STORE STATISTICS")
         print("="*50)
         print(f"Dimension: {self.dimension}")
-        print(f"Total documents: {len(self.documents)}")
+        print(f"Total documents: {len(self.contents)}")
         print(f"Index size: {self.index.ntotal}")
         print(f"Index type: {type(self.index).__name__}")
+        print(f"GPU search: {'on' if self.use_gpu else 'off'}")
+        print(f"Exact search backend: {'usearch' if self._can_use_usearch() else 'faiss'}")
+        print(f"CPU threads: {faiss.omp_get_max_threads()}")
+        # Shows which SIMD kernels FAISS was built with (e.g. AVX2, AVX512)
+        print(f"FAISS build: {faiss.get_compile_options()}")
         print("="*50 + "\n")
 
 
@@ -188,6 +535,8 @@ if __name__ == "__main__":
     """
     Test the vector store
     """
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    
     print("\n🧪 Testing Vector Store\n")
     
     # Create sample documents